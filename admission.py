@@ -0,0 +1,93 @@
+import asyncio
+
+from stats import ServiceTimeStats
+from config import ADMISSION_MAX_WAIT, ADMISSION_MAX_BYTES, ADMISSION_DEFER
+
+
+# Audio seconds and bytes of admitted jobs of one API mode that are not finished yet
+# New jobs are admitted while projected time to process backlog with them fits ADMISSION_MAX_WAIT
+class Backlog:
+    def __init__(self, stats: ServiceTimeStats):
+        self.stats = stats
+        self.seconds = 0
+        self.bytes = 0
+        self.jobs = 0
+        self.workers = 1
+        self.condition = asyncio.Condition()
+
+    # Projected seconds until the job with given cost is processed, None if nothing measured yet
+    def projected_wait(self, cost: float):
+        if self.stats.seconds_per_audio_second is not None:
+            total = (self.seconds + cost) * self.stats.seconds_per_audio_second
+        elif self.stats.seconds_per_request is not None:
+            total = (self.jobs + 1) * self.stats.seconds_per_request
+        else:
+            return None
+
+        return total / max(self.workers, 1)
+
+    # Check if the job fits backlog limits, empty backlog takes any job
+    def fits(self, cost: float, size: int):
+        if not self.jobs:
+            return True
+
+        if ADMISSION_MAX_BYTES and self.bytes + size > ADMISSION_MAX_BYTES:
+            return False
+
+        wait = self.projected_wait(cost)
+        return not ADMISSION_MAX_WAIT or wait is None or wait <= ADMISSION_MAX_WAIT
+
+    # Add job to backlog, returns Admission to release when job is finished
+    def add(self, cost: float, size: int):
+        self.seconds += cost
+        self.bytes += size
+        self.jobs += 1
+        return Admission(self, cost, size)
+
+    # Function to admit job, waits up to ADMISSION_DEFER seconds for backlog to drop
+    # Returns None if job is rejected
+    async def admit(self, cost: float, size: int = None):
+        size = size or 0
+        if self.fits(cost, size):
+            return self.add(cost, size)
+
+        if not ADMISSION_DEFER:
+            return None
+
+        async with self.condition:
+            try:
+                await asyncio.wait_for(self.condition.wait_for(lambda: self.fits(cost, size)), ADMISSION_DEFER)
+            except asyncio.TimeoutError:
+                return None
+
+            return self.add(cost, size)
+
+    # Function to remove finished job from backlog and wake deferred jobs
+    async def remove(self, cost: float, size: int):
+        self.seconds = max(self.seconds - cost, 0)
+        self.bytes = max(self.bytes - size, 0)
+        self.jobs = max(self.jobs - 1, 0)
+        async with self.condition:
+            self.condition.notify_all()
+
+
+# Admitted job in backlog
+class Admission:
+    def __init__(self, backlog: Backlog, cost: float, size: int):
+        self.backlog = backlog
+        self.cost = cost
+        self.size = size
+        self.released = False
+
+    # Function to release job from backlog, can be called more than once
+    async def release(self):
+        if self.released:
+            return
+
+        self.released = True
+        await self.backlog.remove(self.cost, self.size)
+
+
+# Check if admission control is enabled
+def is_admission_enabled():
+    return bool(ADMISSION_MAX_WAIT or ADMISSION_MAX_BYTES)
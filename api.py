@@ -1,44 +1,62 @@
-import base64
+import os
 import asyncio
-from gradio_client import Client
 from aiogram import types
 
 from logger import logger
 from messages.log.api import *
+from messages.log.cache import CACHE_HIT
+from messages.log.job_store import JOBS_RESUMED, JOB_RESUME_ERROR
+from messages.log.batching import BATCH_ERROR
 from messages.telegram.api import *
-from utils import to_thread, send_long_message
-from request_limits import request_limit, make_request_delay, check_request_count, \
+from utils import send_long_message
+from request_limits import request_limit, check_request_count, \
                             request_count_increment, request_count_decrement
-from process_file import get_file
-from utils import reply_message, edit_message
+from process_file import get_file, get_message_file, remove_spool_file, is_video_file, download_file_by_id
+from cache import get_cached_result, save_cached_result
+from backends import create_backend_pool, lend_backends
+from scheduler import create_request_queue
+from jobs import Job, estimate_audio_seconds
+from stats import ServiceTimeStats, ServiceTimer, format_wait_time
+from chunking import is_chunking_needed, transcribe_chunked
+from delivery import ProgressiveMessage
+from batching import is_batchable, collect_batch, record_batch, transcribe_batch
+from transcode import transcode_job_audio, extract_job_audio
+from job_store import is_job_store_enabled, store_job, remove_stored_job, flush_job_store, job_store_loop, \
+                        load_stored_jobs, count_stored_jobs
+from admission import Backlog, is_admission_enabled
+from quotas import is_quota_enabled, reserve_quota, refund_quota, format_window
+from inflight import get_inflight_request, start_inflight_request, finish_inflight_request
+from utils import reply_message, edit_message, delete_message, check_if_admin
 from config import API_URL_TRANSCRIBE, API_URL_DIARIZE, HF_TOKEN_TRANSCRIBE, HF_TOKEN_DIARIZE, \
-                    MAX_MESSAGE_LENGTH, MAX_SIMULTANIOUS_REQUESTS
+                    API_CONCURRENCY_TRANSCRIBE, API_CONCURRENCY_DIARIZE, API_LEND_TRANSCRIBE, API_LEND_DIARIZE, \
+                    MAX_MESSAGE_LENGTH, MAX_SIMULTANIOUS_REQUESTS, TRANSCRIBE_WORKERS, DIARIZE_WORKERS, \
+                    QUEUE_STATUS_INTERVAL, QUEUE_STATUS_MAX_EDITS, PROGRESSIVE_EDIT_INTERVAL, TRANSCODE_AUDIO, \
+                    EXTRACT_VIDEO_AUDIO, SPLIT_PROCESSES
 
 
-if API_URL_TRANSCRIBE:
-    try:
-        gradio_transcribe = Client(API_URL_TRANSCRIBE, hf_token=HF_TOKEN_TRANSCRIBE)
-    except Exception as e:
-        logger.error(API_TRANSSCRIBE_CONNECT_ERROR.format(str(e)))
-else:
-    logger.warning(API_URL_TRANSCRIBE_NOT_SET)
-
-if API_URL_DIARIZE:
-    try:
-        gradio_diarize = Client(API_URL_DIARIZE, hf_token=HF_TOKEN_DIARIZE)
-    except Exception as e:
-        logger.error(API_DIARIZE_CONNECT_ERROR.format(str(e)))
-else:
-    logger.warning(API_URL_TRANSCRIBE_NOT_SET)
+# Pools of backends for each API mode
+transcribe_pool = create_backend_pool("transcribe", API_URL_TRANSCRIBE, HF_TOKEN_TRANSCRIBE, API_CONCURRENCY_TRANSCRIBE)
+diarize_pool = create_backend_pool("diarize", API_URL_DIARIZE, HF_TOKEN_DIARIZE, API_CONCURRENCY_DIARIZE)
 
+# Idle spaces take jobs of the other mode
+lend_backends(transcribe_pool, diarize_pool, API_LEND_TRANSCRIBE)
+lend_backends(diarize_pool, transcribe_pool, API_LEND_DIARIZE)
 
-# Create a semaphore lock to limit concurrent API requests
-api_transcribe_semaphore = asyncio.Semaphore(1)
-api_diarize_semaphore = asyncio.Semaphore(1)
 
 # Requests queues
-transcribe_request_queue = asyncio.Queue()
-diarize_request_queue = asyncio.Queue()
+transcribe_request_queue = create_request_queue()
+diarize_request_queue = create_request_queue()
+
+# Measured API service time for ETA
+transcribe_stats = ServiceTimeStats()
+diarize_stats = ServiceTimeStats()
+
+# Audio waiting for each API, new files are rejected if it can't be processed in time
+transcribe_backlog = Backlog(transcribe_stats)
+diarize_backlog = Backlog(diarize_stats)
+
+# Running queue workers tasks
+worker_tasks = []
 
 
 # Function to process requests
@@ -54,117 +72,513 @@ async def process_request(message: types.Message, reply=False, diarize=False):
             return
 
         await request_count_increment()
-        await make_request_delay()
 
-        result = await get_file(message, reply)
-        if not result:
-            return
+        user = message.from_user
 
-        data, msg, fileid = result
+        # Answer repeated files from cache without downloading them
+        target = message.reply_to_message if reply else message
+        file = get_message_file(target)
+        inflight = None
+        if file:
+            cached = await get_cached_result(file.file_unique_id, diarize)
+            if cached is not None:
+                logger.info(CACHE_HIT.format(user.id, message.chat.id, user.username, file.file_id, cached))
+                await send_result(target, cached, True)
+                return
 
-        user = message.from_user
-        await perform_api_request(data, fileid, msg, user.id, user.username, message.chat.id, diarize)
+            # Same file is being processed for another message, wait for its result
+            # Checked again after waiting, another duplicate may have taken place of failed request
+            while get_inflight_request(file.file_unique_id, diarize):
+                if await join_inflight_request(target, file, diarize):
+                    return
+
+            # In split mode duplicates are coalesced by worker processes
+            if not SPLIT_PROCESSES:
+                inflight = start_inflight_request(file.file_unique_id, diarize)
+
+        charge = None
+        admission = None
+        queued = False
+        try:
+            # Admins are not limited by quotas
+            if file and is_quota_enabled() and not check_if_admin(message.chat.id, user.id):
+                charge = await charge_quota(message, target, file)
+                if not charge:
+                    return
+
+            # Worker processes keep their backlog in job store
+            if file and is_admission_enabled() and not SPLIT_PROCESSES:
+                admission = await admit_request(target, file, diarize)
+                if not admission:
+                    return
+
+            result = await get_file(message, reply)
+            if not result:
+                return
+
+            audio_path, msg, file = result
+
+            job = Job(audio_path, file.file_id, file.file_unique_id, msg, user.id, user.username, message.chat.id,
+                        diarize, getattr(file, "duration", None), file.file_size, is_video_file(file))
+            job.inflight = inflight
+            job.admission = admission
+
+            # Whisper resamples to 16 kHz mono anyway, upload smaller file
+            if TRANSCODE_AUDIO:
+                await transcode_job_audio(job)
+            elif EXTRACT_VIDEO_AUDIO and job.is_video:
+                await extract_job_audio(job)
+
+            queued = await perform_api_request(job)
+        finally:
+            # Duplicates process the file themselves if it was not queued
+            if inflight and not queued:
+                finish_inflight_request(file.file_unique_id, diarize, inflight)
+
+            if admission and not queued:
+                await admission.release()
+
+            if charge and not queued:
+                await refund_quota(charge)
     except Exception as e:
         logger.error(PROCESSING_ERROR.format(user.id, message.chat.id, user.username, str(e)))
     finally:
         await request_count_decrement()
 
 
-# Fuction to process transcribe API queue
-async def transcribe_queue_process():
+# Function to count file in audio quotas of user and group chat, replies when quota is used up
+async def charge_quota(message: types.Message, target: types.Message, file):
+    user = message.from_user
+    chat_id = message.chat.id if message.chat.type != "private" else None
+    cost = estimate_audio_seconds(getattr(file, "duration", None), file.file_size)
+    charge, exceeded = await reserve_quota(user.id, chat_id, cost, file.file_size)
+    if charge:
+        return charge
+
+    logger.info(QUOTA_EXCEEDED.format(user.id, message.chat.id, user.username, file.file_id, exceeded.scope,
+                                      exceeded.window))
+    window = format_window(exceeded.window)
+    if exceeded.wait is None:
+        await reply_message(target, TG_QUOTA_FILE_TOO_LONG.format(exceeded.scope, window))
+    elif exceeded.wait > 0:
+        await reply_message(target, TG_QUOTA_EXCEEDED_ETA.format(exceeded.scope, window,
+                                                                 format_wait_time(exceeded.wait)))
+    else:
+        await reply_message(target, TG_QUOTA_EXCEEDED.format(exceeded.scope, window))
+
+
+# Function to admit file to API backlog, replies with estimated wait if backlog is full
+async def admit_request(target: types.Message, file, diarize: bool):
+    backlog = diarize_backlog if diarize else transcribe_backlog
+    cost = estimate_audio_seconds(getattr(file, "duration", None), file.file_size)
+    admission = await backlog.admit(cost, file.file_size)
+    if admission:
+        return admission
+
+    user = target.from_user
+    logger.info(BACKLOG_FULL.format(user.id, target.chat.id, user.username, file.file_id,
+                                    backlog.seconds, backlog.bytes))
+    wait = backlog.projected_wait(cost)
+    if wait is None:
+        await reply_message(target, TG_BACKLOG_FULL)
+    else:
+        await reply_message(target, TG_BACKLOG_FULL_ETA.format(format_wait_time(wait)))
+
+
+# Function to release finished job from API backlog
+async def release_job_admission(job: Job):
+    if job.admission:
+        await job.admission.release()
+
+
+# Function to wait for result of the same file processed for another message and reply with it
+# Returns False if there is no such request or it failed before reaching API
+async def join_inflight_request(target: types.Message, file, diarize: bool):
+    inflight = get_inflight_request(file.file_unique_id, diarize)
+    if not inflight:
+        return False
+
+    user = target.from_user
+    logger.info(INFLIGHT_JOINED.format(user.id, target.chat.id, user.username, file.file_id))
+    msg = await reply_message(target, TG_WAIT_DIARIZE if diarize else TG_WAIT_TRANSCRIBE)
+    while inflight:
+        if await deliver_inflight_result(msg, inflight, diarize):
+            return True
+
+        # Running request failed before API call, wait for the next one or take its place
+        inflight = get_inflight_request(file.file_unique_id, diarize)
+
+    await delete_message(msg)
+    return False
+
+
+# Function to wait for result of running request and send it to msg
+# Returns False if request was not processed
+async def deliver_inflight_result(msg: types.Message, inflight: asyncio.Future, diarize: bool):
+    try:
+        result = await asyncio.shield(inflight)
+    except Exception:
+        await edit_message(msg, TG_API_DIARIZE_ERROR if diarize else TG_API_TRANSCRIBE_ERROR)
+        return True
+
+    if result is None:
+        return False
+
+    await send_result(msg, result)
+    return True
+
+
+# Function to send API result, edits msg or replies to it if new_reply
+async def send_result(msg: types.Message, result: str, new_reply=False):
+    if not result:
+        if new_reply:
+            await reply_message(msg, TG_API_NO_TEXT)
+        else:
+            await edit_message(msg, TG_API_NO_TEXT)
+    elif len(result) > MAX_MESSAGE_LENGTH:
+        await send_long_message(msg, result, new_reply)
+    elif new_reply:
+        await reply_message(msg, result)
+    else:
+        await edit_message(msg, result)
+
+
+# Function to pass job result to duplicate requests waiting for it
+def finish_job_inflight(job: Job, result=None, error: Exception = None):
+    if job.inflight:
+        finish_inflight_request(job.file_unique_id, job.diarize, job.inflight, result, error)
+
+
+# Function to process one transcribe API job
+async def transcribe_job(job: Job):
+    async with job.msg_lock:
+        job.started = True
+        msg = await edit_message(job.msg, TG_WAIT_TRANSCRIBE)
+
+    progress = None
+    try:
+        if is_chunking_needed(job):
+            # Long audio is split and chunks are transcribed in parallel, partial text is shown to user
+            progress = ProgressiveMessage(msg) if PROGRESSIVE_EDIT_INTERVAL else None
+            with ServiceTimer(transcribe_stats, job.cost):
+                result = await transcribe_chunked(transcribe_pool, job, progress.update if progress else None)
+        else:
+            with ServiceTimer(transcribe_stats, job.cost):
+                result = await transcribe_pool.request("transcribe", job.audio_path, job.cost)
+        logger.info(TRANSCRIBE_RESULT.format(job.user_id, job.chat_id, job.username, job.file_id, result))
+        await save_cached_result(job.file_unique_id, False, result)
+        finish_job_inflight(job, result)
+    except Exception as e:
+        finish_job_inflight(job, error=e)
+        logger.error(TRANSCRIBE_ERROR.format(job.user_id, job.chat_id, job.username, job.file_id, str(e)))
+        if progress:
+            await progress.fail(TG_API_TRANSCRIBE_ERROR)
+        else:
+            await edit_message(msg, TG_API_TRANSCRIBE_ERROR)
+        return
+    finally:
+        remove_spool_file(job.audio_path)
+
+    try:
+        if progress:
+            await progress.finish(result)
+        else:
+            await send_result(msg, result)
+    except Exception as e:
+        logger.error(TRANSCRIBE_SENDING_ERROR.format(job.user_id, job.chat_id, job.username, job.file_id, str(e)))
+        await edit_message(msg, TG_API_TRANSCRIBE_SEND_ERROR)
+
+
+# Function to process batch of short transcribe API jobs with one request
+# Jobs are sent one by one if batch can't be processed
+async def transcribe_batch_job(jobs: list):
+    for job in jobs:
+        async with job.msg_lock:
+            job.started = True
+            job.msg = await edit_message(job.msg, TG_WAIT_TRANSCRIBE)
+
+    try:
+        with ServiceTimer(transcribe_stats, sum(job.cost for job in jobs)):
+            results = await transcribe_batch(transcribe_pool, jobs)
+    except Exception as e:
+        logger.error(BATCH_ERROR.format(len(jobs), str(e)))
+        record_batch(len(jobs), False)
+        await asyncio.gather(*(transcribe_job(job) for job in jobs))
+        return
+
+    record_batch(len(jobs), True)
+
+    for job, result in zip(jobs, results):
+        logger.info(TRANSCRIBE_RESULT.format(job.user_id, job.chat_id, job.username, job.file_id, result))
+        remove_spool_file(job.audio_path)
+        await save_cached_result(job.file_unique_id, False, result)
+        finish_job_inflight(job, result)
+
+        try:
+            await send_result(job.msg, result)
+        except Exception as e:
+            logger.error(TRANSCRIBE_SENDING_ERROR.format(job.user_id, job.chat_id, job.username, job.file_id, str(e)))
+            await edit_message(job.msg, TG_API_TRANSCRIBE_SEND_ERROR)
+
+
+# Function to process one diarize API job
+async def diarize_job(job: Job):
+    async with job.msg_lock:
+        job.started = True
+        msg = await edit_message(job.msg, TG_WAIT_DIARIZE)
+
+    try:
+        with ServiceTimer(diarize_stats, job.cost):
+            result = await diarize_pool.request("diarize", job.audio_path, job.cost)
+        logger.info(DIARIZE_RESULT.format(job.user_id, job.chat_id, job.username, job.file_id, result))
+        await save_cached_result(job.file_unique_id, True, result)
+        finish_job_inflight(job, result)
+    except Exception as e:
+        finish_job_inflight(job, error=e)
+        if e:
+            logger.error(DIARIZE_ERROR.format(job.user_id, job.chat_id, job.username, job.file_id, str(e)))
+            await edit_message(msg, TG_API_DIARIZE_ERROR)
+        else:
+            logger.error(DIARIZE_NO_SPEAKERS_ERROR.format(job.user_id, job.chat_id, job.username, job.file_id))
+            await edit_message(msg, TG_API_DIARIZE_NO_SPEAKERS_ERROR)
+
+        return
+    finally:
+        remove_spool_file(job.audio_path)
+
+    try:
+        await send_result(msg, result)
+    except Exception as e:
+        logger.error(DIARIZE_SENDING_ERROR.format(job.user_id, job.chat_id, job.username, job.file_id, str(e)))
+        await edit_message(msg, TG_API_DIARIZE_SEND_ERROR)
+
+
+# Function to consume API queue, one of the pool workers
+# With batch_handler short jobs are collected to batches
+async def queue_worker(name: str, queue: asyncio.Queue, job_handler, batch_handler=None):
+    logger.info(WORKER_STARTED.format(name))
     while True:
-        async with api_transcribe_semaphore:
-            try:
-                # Get the message and its arguments from the queue
-                audio, msg, user_id, chat_id, username = await transcribe_request_queue.get()
-                msg = await edit_message(msg, TG_WAIT_TRANSCRIBE)
+        # Get the message and its arguments from the queue
+        job = await queue.get()
+        jobs = [job]
+        try:
+            # Batches are not collected if no transcribe backend returns timestamps
+            if batch_handler and is_batchable(job) and transcribe_pool.supports_segments():
+                jobs = await collect_batch(queue, job)
+                if len(jobs) == 1:
+                    record_batch(1, False)
 
-                try:
-                    result = await to_thread(gradio_transcribe.predict, audio, "transcribe", False, api_name="/predict")
-                    result = result[0]
-                    logger.info(TRANSCRIBE_RESULT.format(user_id, chat_id, username, audio['name'], result))
-                except Exception as e:
-                    logger.error(TRANSCRIBE_RESULT.format(user_id, chat_id, username, audio['name'], str(e)))
-                    await edit_message(msg, TG_API_TRANSCRIBE_ERROR)
-                    continue
+            if len(jobs) > 1:
+                await batch_handler(jobs)
+            else:
+                await job_handler(job)
 
-                try:
-                    if len(result) <= MAX_MESSAGE_LENGTH:
-                        await edit_message(msg, result)
-                    elif result:
-                        await send_long_message(msg, result, False)
-                    else:
-                        await edit_message(msg, TG_API_NO_TEXT)
-                except Exception as e:
-                    logger.error(TRANSCRIBE_SENDING_ERROR.format(user_id, chat_id, username, audio['name'], str(e)))
-                    await edit_message(msg, TG_API_TRANSCRIBE_SEND_ERROR)
+            for done_job in jobs:
+                remove_stored_job(done_job)
+        except Exception as e:
+            # Worker error must not stop the pool
+            logger.error(WORKER_ERROR.format(name, str(e)))
+            for failed_job in jobs:
+                finish_job_inflight(failed_job, error=e)
+                remove_stored_job(failed_job)
+        finally:
+            for finished_job in jobs:
+                await release_job_admission(finished_job)
+                queue.task_done()
+
+        await asyncio.sleep(0.1)
+
+
+# Function to get queue status texts with position and estimated wait for all queued jobs
+def get_queue_status_texts(queue, stats: ServiceTimeStats):
+    texts = []
+    wait = 0
+    for i, job in enumerate(queue.ordered_jobs()):
+        if wait is not None:
+            estimate = stats.estimate(job)
+            if estimate is None:
+                wait = None
+
+        if wait is None:
+            text = TG_API_QUEUED.format(i + 1)
+        else:
+            text = TG_API_QUEUED_ETA.format(i + 1, format_wait_time(wait / max(queue.workers, 1)))
+            wait += estimate
+
+        texts.append((job, text))
+
+    return texts
+
+
+# Function to update queued job reply message with its position and estimated wait
+async def update_queue_status(job: Job, text: str):
+    async with job.msg_lock:
+        if job.started or job.status_text == text:
+            return False
+
+        msg = await edit_message(job.msg, text, send_new=False)
+        if msg:
+            job.msg = msg
 
-                await asyncio.sleep(0.1)
-            except Exception as e:
-                continue
+        job.status_text = text
+        return True
 
 
-# Fuction to process diarize API queue
-async def diarize_queue_process():
+# Function to periodically update queued jobs replies, throttled to save Telegram rate limits
+async def queue_status_loop():
     while True:
-        async with api_diarize_semaphore:
-            try:
-                # Get the message and its arguments from the queue
-                audio, msg, user_id, chat_id, username = await diarize_request_queue.get()
-                msg = await edit_message(msg, TG_WAIT_DIARIZE)
+        await asyncio.sleep(QUEUE_STATUS_INTERVAL)
 
-                try:
-                    result = await to_thread(gradio_diarize.predict, audio, "transcribe", True, api_name="/predict")
-                    logger.info(DIARIZE_RESULT.format(user_id, chat_id, username, audio['name'], result))
-                except Exception as e:
-                    if e:
-                        logger.error(DIARIZE_ERROR.format(user_id, chat_id, username, audio['name'], str(e)))
-                        await edit_message(msg, TG_API_DIARIZE_ERROR)
-                    else:
-                        logger.error(DIARIZE_NO_SPEAKERS_ERROR.format(user_id, chat_id, username, audio['name']))
-                        await edit_message(msg, TG_API_DIARIZE_NO_SPEAKERS_ERROR)
+        edits = 0
+        edited_chats = set()
+        for queue, stats in ((transcribe_request_queue, transcribe_stats), (diarize_request_queue, diarize_stats)):
+            for job, text in get_queue_status_texts(queue, stats):
+                if edits >= QUEUE_STATUS_MAX_EDITS:
+                    break
 
+                # One edit per chat each update, group chats have stricter limits
+                if job.chat_id in edited_chats:
                     continue
 
                 try:
-                    if len(result) <= MAX_MESSAGE_LENGTH:
-                        await edit_message(msg, result)
-                    elif result:
-                        await send_long_message(msg, result, False)
-                    else:
-                        await edit_message(msg, TG_API_NO_TEXT)
+                    if await update_queue_status(job, text):
+                        edits += 1
+                        edited_chats.add(job.chat_id)
                 except Exception as e:
-                    logger.error(DIARIZE_SENDING_ERROR.format(user_id, chat_id, username, audio['name'], str(e)))
-                    await edit_message(msg, TG_API_DIARIZE_SEND_ERROR)
+                    logger.error(QUEUE_STATUS_ERROR.format(job.user_id, job.chat_id, job.username, str(e)))
 
-                await asyncio.sleep(0.1)
-            except Exception as e:
-                continue
 
+# Function to start API queues workers pool and backends health checks
+# Backends are connected in background, requests wait in queue until they are ready
+def start_queue_workers(transcribe_workers: int = TRANSCRIBE_WORKERS, diarize_workers: int = DIARIZE_WORKERS):
+    if not transcribe_pool.backends:
+        logger.warning(API_URL_TRANSCRIBE_NOT_SET)
 
-# Function to perform the API request with retries
-async def perform_api_request(data: bytes, id: str, msg: types.Message,
-                                user_id: int, username: str, chat_id: int, diarize: bool):
-    if diarize and not "gradio_diarize" in globals():
-        logger.error(API_DIARIZE_NOT_CONNECTED.format(user_id, chat_id, username))
-        await edit_message(msg, TG_API_DIARIZE_NOT_CONNECTED)
-        return
+    if not diarize_pool.backends:
+        logger.warning(API_URL_DIARIZE_NOT_SET)
+
+    # By default run one worker per backend slot
+    transcribe_request_queue.workers = transcribe_workers or max(transcribe_pool.capacity(), 1)
+    transcribe_backlog.workers = transcribe_request_queue.workers
+    for i in range(transcribe_request_queue.workers):
+        worker = queue_worker(f"transcribe-{i + 1}", transcribe_request_queue, transcribe_job, transcribe_batch_job)
+        worker_tasks.append(asyncio.create_task(worker))
+
+    diarize_request_queue.workers = diarize_workers or max(diarize_pool.capacity(), 1)
+    diarize_backlog.workers = diarize_request_queue.workers
+    for i in range(diarize_request_queue.workers):
+        worker = queue_worker(f"diarize-{i + 1}", diarize_request_queue, diarize_job)
+        worker_tasks.append(asyncio.create_task(worker))
+
+    for pool in (transcribe_pool, diarize_pool):
+        if pool.backends:
+            worker_tasks.append(asyncio.create_task(pool.health_loop()))
+
+    if QUEUE_STATUS_INTERVAL:
+        worker_tasks.append(asyncio.create_task(queue_status_loop()))
+
+    if is_job_store_enabled():
+        worker_tasks.append(asyncio.create_task(job_store_loop()))
 
-    if not diarize and not "gradio_transcribe" in globals():
-        logger.error(API_TRANSCRIBE_NOT_CONNECTED.format(user_id, chat_id, username))
-        await edit_message(msg, TG_API_TRANSCRIBE_NOT_CONNECTED)
+        # Worker processes take stored jobs themselves
+        if not SPLIT_PROCESSES:
+            worker_tasks.append(asyncio.create_task(resume_stored_jobs()))
+
+
+# Function to download again file of stored job if it was removed
+async def prepare_stored_job(job: Job):
+    if os.path.exists(job.audio_path):
         return
 
-    audio = {
-        "name": id,
-        "data": base64.b64encode(data).decode()
-    }
+    job.audio_path = await download_file_by_id(job.file_id)
+    if TRANSCODE_AUDIO:
+        await transcode_job_audio(job)
+    elif EXTRACT_VIDEO_AUDIO and job.is_video:
+        await extract_job_audio(job)
 
-    if diarize:
-        if diarize_request_queue.qsize():
-            msg = await edit_message(msg, TG_API_QUEUED)
-        await diarize_request_queue.put((audio, msg, user_id, chat_id, username))
-    else:
-        if transcribe_request_queue.qsize():
-            msg = await edit_message(msg, TG_API_QUEUED)
-        await transcribe_request_queue.put((audio, msg, user_id, chat_id, username))
+
+# Function to drop stored job that can't be processed
+async def fail_stored_job(job: Job, error: Exception):
+    logger.error(JOB_RESUME_ERROR.format(job.user_id, job.chat_id, job.username, job.file_id, str(error)))
+    remove_stored_job(job)
+    await edit_message(job.msg, TG_API_DIARIZE_ERROR if job.diarize else TG_API_TRANSCRIBE_ERROR)
+
+
+# Function to put jobs left after previous run back to the queues
+# Jobs interrupted by restart are processed again, files removed meanwhile are downloaded again
+async def resume_stored_jobs():
+    jobs = await load_stored_jobs()
+    for job in jobs:
+        try:
+            await prepare_stored_job(job)
+            if not await perform_api_request(job):
+                remove_stored_job(job)
+        except Exception as e:
+            await fail_stored_job(job, e)
+
+    if jobs:
+        logger.info(JOBS_RESUMED.format(len(jobs)))
+
+
+# Function to stop API queues workers pool
+async def stop_queue_workers():
+    for task in worker_tasks:
+        task.cancel()
+
+    await asyncio.gather(*worker_tasks, return_exceptions=True)
+    worker_tasks.clear()
+
+    await transcribe_pool.close()
+    await diarize_pool.close()
+    await flush_job_store()
+    logger.info(WORKERS_STOPPED)
+
+
+# Function to put API request to the queue, returns True if job is queued
+async def perform_api_request(job: Job):
+    if job.diarize and not diarize_pool.accepts_requests():
+        remove_spool_file(job.audio_path)
+        logger.error(API_DIARIZE_NOT_CONNECTED.format(job.user_id, job.chat_id, job.username))
+        await edit_message(job.msg, TG_API_DIARIZE_NOT_CONNECTED)
+        return False
+
+    if not job.diarize and not transcribe_pool.accepts_requests():
+        remove_spool_file(job.audio_path)
+        logger.error(API_TRANSCRIBE_NOT_CONNECTED.format(job.user_id, job.chat_id, job.username))
+        await edit_message(job.msg, TG_API_TRANSCRIBE_NOT_CONNECTED)
+        return False
+
+    if SPLIT_PROCESSES:
+        return await send_to_broker(job)
+
+    # Queue keeps only path to the downloaded file, gradio client uploads it itself
+    queue = diarize_request_queue if job.diarize else transcribe_request_queue
+    stats = diarize_stats if job.diarize else transcribe_stats
+    async with job.msg_lock:
+        await queue.put(job)
+
+        # Report position and estimated wait if job is not picked up by idle worker
+        if queue.is_waiting(job):
+            for queued_job, text in get_queue_status_texts(queue, stats):
+                if queued_job is job:
+                    job.status_text = text
+                    job.msg = await edit_message(job.msg, text)
+                    break
+
+    # Resumed jobs are always taken, backlog only counts them
+    if not job.admission and is_admission_enabled():
+        backlog = diarize_backlog if job.diarize else transcribe_backlog
+        job.admission = backlog.add(job.cost, job.file_size or 0)
+
+    store_job(job)
+    return True
+
+
+# Function to pass job to worker processes through job store, reply shows number of waiting jobs
+async def send_to_broker(job: Job):
+    store_job(job)
+    await flush_job_store()
+
+    job.status_text = TG_API_QUEUED.format(await count_stored_jobs(job.diarize))
+    job.msg = await edit_message(job.msg, job.status_text)
+    return True
@@ -0,0 +1,100 @@
+import re
+import asyncio
+
+from config import FFMPEG_PATH, FFPROBE_PATH
+
+
+SILENCE_START_PATTERN = re.compile(r"silence_start: (-?[\d.]+)")
+SILENCE_END_PATTERN = re.compile(r"silence_end: (-?[\d.]+)")
+
+# Containers for audio codecs that can be copied from video without re-encoding
+AUDIO_COPY_EXTENSIONS = {
+    "aac": ".m4a",
+    "alac": ".m4a",
+    "mp3": ".mp3",
+    "opus": ".ogg",
+    "vorbis": ".ogg",
+    "flac": ".flac"
+}
+
+
+# Error of ffmpeg or ffprobe process
+class FFmpegError(Exception):
+    pass
+
+
+# Function to run ffmpeg/ffprobe process, returns stdout and stderr
+async def run_process(*args):
+    process = await asyncio.create_subprocess_exec(*args, stdin=asyncio.subprocess.DEVNULL,
+                                                   stdout=asyncio.subprocess.PIPE,
+                                                   stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+
+    if process.returncode:
+        raise FFmpegError(stderr.decode(errors="ignore").strip()[-500:])
+
+    return stdout.decode(errors="ignore"), stderr.decode(errors="ignore")
+
+
+# Function to get media duration in seconds
+async def get_duration(path: str):
+    stdout, _ = await run_process(FFPROBE_PATH, "-v", "error", "-show_entries", "format=duration",
+                                  "-of", "default=noprint_wrappers=1:nokey=1", path)
+    return float(stdout.strip())
+
+
+# Function to get codec name of the first audio stream, None if there is no audio
+async def get_audio_codec(path: str):
+    stdout, _ = await run_process(FFPROBE_PATH, "-v", "error", "-select_streams", "a:0",
+                                  "-show_entries", "stream=codec_name", "-of", "default=noprint_wrappers=1:nokey=1", path)
+    return stdout.strip() or None
+
+
+# Function to copy the first audio stream without re-encoding
+async def copy_audio_stream(path: str, output_path: str):
+    await run_process(FFMPEG_PATH, "-v", "error", "-y", "-i", path, "-map", "0:a:0", "-vn", "-c:a", "copy", output_path)
+
+
+# Function to detect silent intervals, returns list of (start, end) in seconds
+async def detect_silences(path: str, threshold: str, min_duration: float):
+    _, stderr = await run_process(FFMPEG_PATH, "-hide_banner", "-nostats", "-i", path, "-vn",
+                                  "-af", f"silencedetect=noise={threshold}:d={min_duration}",
+                                  "-f", "null", "-")
+
+    starts = [float(x) for x in SILENCE_START_PATTERN.findall(stderr)]
+    ends = [float(x) for x in SILENCE_END_PATTERN.findall(stderr)]
+    return list(zip(starts, ends))
+
+
+# Function to cut audio fragment to 16 kHz mono FLAC file
+async def extract_fragment(path: str, output_path: str, start: float, duration: float):
+    await run_process(FFMPEG_PATH, "-v", "error", "-y", "-ss", f"{start:.3f}", "-t", f"{duration:.3f}",
+                      "-i", path, "-vn", "-ac", "1", "-ar", "16000", output_path)
+
+
+# Function to transcode audio to mono file with given codec, sample rate and bitrate, video is dropped
+async def transcode(path: str, output_path: str, codec: str, sample_rate: int, bitrate: str):
+    args = [FFMPEG_PATH, "-v", "error", "-y", "-i", path, "-vn", "-ac", "1", "-ar", str(sample_rate), "-c:a", codec]
+    if bitrate:
+        args += ["-b:a", bitrate]
+
+    await run_process(*args, output_path)
+
+
+# Function to join audio files into one 16 kHz mono FLAC file with silence between them
+async def concat_with_silence(paths: list, output_path: str, silence: float):
+    args = [FFMPEG_PATH, "-v", "error", "-y"]
+    filters = []
+    for i, path in enumerate(paths):
+        args += ["-i", path]
+        pad = f",apad=pad_dur={silence:.3f}" if i < len(paths) - 1 else ""
+        filters.append(f"[{i}:a:0]aresample=16000,aformat=channel_layouts=mono{pad}[a{i}]")
+
+    inputs = "".join(f"[a{i}]" for i in range(len(paths)))
+    filters.append(f"{inputs}concat=n={len(paths)}:v=0:a=1[out]")
+    await run_process(*args, "-filter_complex", ";".join(filters), "-map", "[out]", output_path)
@@ -0,0 +1,694 @@
+import re
+import time
+import random
+import asyncio
+import aiohttp
+import requests
+import threading
+import multiprocessing
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+import local_engine
+from logger import logger
+from gradio_api import AsyncGradioClient
+from messages.log.backends import *
+from utils import to_thread, to_executor
+from config import API_HEALTH_CHECK_INTERVAL, API_HEALTH_CHECK_TIMEOUT, LOCAL_ENGINE_WORKERS, \
+                    LOCAL_ENGINE_MODEL, LOCAL_ENGINE_MODES, API_RETRIES, API_RETRY_BASE_DELAY, \
+                    API_RETRY_MAX_DELAY, API_REQUEST_TIMEOUT, CIRCUIT_BREAKER_THRESHOLD, \
+                    CIRCUIT_BREAKER_TIMEOUT, API_HEDGE_PERCENTILE, API_SYNC_CLIENT, API_EXECUTOR_WORKERS, \
+                    API_RECONNECT_INTERVAL, API_CONNECT_WAIT
+
+
+# Error messages of Gradio spaces that are transient, other errors are matched by status code and type
+TRANSIENT_ERROR_MARKERS = ("queue is full",)
+
+# Network errors worth retrying, httpx is used by gradio_client
+TRANSIENT_ERROR_TYPES = (asyncio.TimeoutError, TimeoutError, ConnectionError, requests.ConnectionError,
+                         requests.Timeout, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+if httpx:
+    TRANSIENT_ERROR_TYPES += (httpx.TransportError,)
+
+# Number of latency samples used for hedged requests
+HEDGE_SAMPLES = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+# Raised when all backends of the pool are down
+class BackendUnavailableError(Exception):
+    pass
+
+
+# Raised when backend result has no timestamps, so it can't be split to segments
+class SegmentsUnsupportedError(ValueError):
+    pass
+
+
+# Get HTTP status code of aiohttp, requests or httpx error, None for other errors
+def get_error_status(e: Exception):
+    if isinstance(e, aiohttp.ClientResponseError):
+        return e.status
+
+    response = getattr(e, "response", None)
+    return getattr(response, "status_code", None)
+
+
+# Check if error is transient: timeouts, connection errors, full queue, 429 and 5xx responses
+def is_transient_error(e: Exception):
+    status = get_error_status(e)
+    if status is not None:
+        return status == 429 or status >= 500
+
+    if isinstance(e, TRANSIENT_ERROR_TYPES):
+        return True
+
+    message = str(e).lower()
+    return any(marker in message for marker in TRANSIENT_ERROR_MARKERS)
+
+
+# Function to get backoff delay with full jitter for retry attempt
+def get_backoff_delay(attempt: int):
+    return random.uniform(0, min(API_RETRY_MAX_DELAY, API_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+# Function to convert backend result to plain text
+# Supports text, gradio outputs tuple, {"text": ...} dict and list of segments dicts
+def normalize_result(result):
+    if result is None:
+        return ""
+
+    if isinstance(result, str):
+        return result.strip()
+
+    if isinstance(result, dict):
+        return normalize_result(result.get("text"))
+
+    if isinstance(result, (list, tuple)):
+        if result and all(isinstance(segment, dict) for segment in result):
+            lines = []
+            for segment in result:
+                text = normalize_result(segment.get("text"))
+                speaker = segment.get("speaker")
+                lines.append(f"{speaker}: {text}" if speaker else text)
+
+            return "\n".join(lines) if any("speaker" in segment for segment in result) else " ".join(lines)
+
+        return normalize_result(result[0]) if result else ""
+
+    return str(result)
+
+
+# Timestamped line of Whisper output: "[00:01.000 -> 00:04.500] text"
+TIMESTAMP_LINE_PATTERN = re.compile(r"^\[([\d:.]+)\s*->\s*([\d:.]+)\]\s*(.*)$")
+
+
+# Function to convert "hh:mm:ss.ms" or "mm:ss.ms" to seconds
+def parse_timestamp(timestamp: str):
+    seconds = 0.0
+    for part in timestamp.split(":"):
+        seconds = seconds * 60 + float(part)
+
+    return seconds
+
+
+# Function to get segments list [{"start", "end", "text"}] from API result
+# Raises SegmentsUnsupportedError without timestamps
+def normalize_segments(result):
+    if isinstance(result, (list, tuple)) and result and all(isinstance(segment, dict) for segment in result):
+        return [{"start": float(segment["start"]), "end": float(segment["end"]),
+                 "text": normalize_result(segment.get("text"))} for segment in result]
+
+    text = normalize_result(result)
+    segments = []
+    for line in text.splitlines():
+        match = TIMESTAMP_LINE_PATTERN.match(line.strip())
+        if match:
+            segments.append({"start": parse_timestamp(match.group(1)), "end": parse_timestamp(match.group(2)),
+                             "text": match.group(3).strip()})
+        elif line.strip():
+            raise SegmentsUnsupportedError("result has no timestamps")
+
+    return segments
+
+
+# Speaker label at the start of diarized line, optionally after timestamp: "[00:01 -> 00:03] SPEAKER_00: text"
+SPEAKER_LABEL_PATTERN = re.compile(r"^\s*(?:\[[^\]]*\]\s*)?(?:SPEAKER[_ ]?\d+|Speaker[_ ]?\d+)\s*:\s*", re.IGNORECASE)
+
+
+# Function to convert diarized text to plain transcription
+def strip_speaker_labels(text: str):
+    lines = [SPEAKER_LABEL_PATTERN.sub("", line).strip() for line in text.splitlines()]
+    return " ".join(line for line in lines if line)
+
+
+# Circuit breaker, stops sending requests to backend after several transient errors in a row
+# After timeout one trial request is allowed (half-open), success closes the circuit
+class CircuitBreaker:
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+
+    # Check if circuit is open and requests must not be sent
+    def is_open(self):
+        return self.opened_at is not None and time.monotonic() - self.opened_at < CIRCUIT_BREAKER_TIMEOUT
+
+    # Check if request can be sent, only one trial request when half-open
+    def allows_request(self, active: int):
+        if self.opened_at is None:
+            return True
+
+        return not self.is_open() and active == 0
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    # Record transient error, returns True if circuit was opened
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= CIRCUIT_BREAKER_THRESHOLD:
+            self.opened_at = time.monotonic()
+            return True
+
+        return False
+
+
+# Transcription engine interface, has concurrency cap and health status
+class Backend:
+    # Overflow backends get requests only when all regular backends are busy
+    overflow = False
+
+    def __init__(self, mode: str, name: str, max_concurrency: int = 1):
+        self.mode = mode
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.healthy = False
+        self.active = 0
+        self.breaker = CircuitBreaker()
+
+        # Cleared when backend returns result without timestamps, it gets no segments requests after that
+        self.segments_supported = True
+
+        # Pool of the backend mode, set for backends lent to other pool
+        self.pool = None
+
+    # Current load of the backend, 0 - idle, 1 - all slots busy
+    @property
+    def load(self):
+        return self.active / self.max_concurrency
+
+    # Check if backend can accept one more request
+    def is_available(self):
+        return self.healthy and self.active < self.max_concurrency and self.breaker.allows_request(self.active)
+
+    # Check if backend is able to serve requests now or after busy slots are released
+    def is_serviceable(self):
+        return self.healthy and not self.breaker.is_open()
+
+    # Function to initialize backend (blocking)
+    def connect(self):
+        pass
+
+    # Function to check if backend is alive, reconnects if needed (blocking)
+    def probe(self):
+        pass
+
+    # Function to release backend resources
+    async def close(self):
+        pass
+
+    # Function to transcribe audio file, returns text
+    async def transcribe(self, audio_path: str):
+        raise NotImplementedError
+
+    # Function to transcribe audio file, returns segments with timestamps
+    async def transcribe_segments(self, audio_path: str):
+        raise NotImplementedError
+
+    # Function to diarize audio file, returns text with speakers
+    async def diarize(self, audio_path: str):
+        raise NotImplementedError
+
+
+# Threads for blocking Gradio client, separate from default executor
+api_executor = None
+
+# All Gradio backends, used to size executor for blocking client
+gradio_backends = []
+
+
+# Function to get executor for blocking Gradio client
+# Created on first blocking call, by default one thread for each slot of spaces without async client
+def get_api_executor():
+    global api_executor
+    if not api_executor:
+        workers = API_EXECUTOR_WORKERS or sum(backend.max_concurrency for backend in gradio_backends
+                                              if not backend.async_client)
+        api_executor = ThreadPoolExecutor(workers or 1, thread_name_prefix="gradio")
+
+    return api_executor
+
+
+# Gradio space backend, uses async HTTP API if space supports it
+class GradioBackend(Backend):
+    def __init__(self, mode: str, url: str, hf_token: str = None, max_concurrency: int = 1):
+        super().__init__(mode, url, max_concurrency)
+        self.url = url
+        self.hf_token = hf_token or None
+        self.client = None
+        self.async_client = None
+        gradio_backends.append(self)
+
+    # Heavy gradio_client is imported on first connect, not on bot start
+    def connect(self):
+        from gradio_client import Client
+        self.client = Client(self.url, hf_token=self.hf_token)
+        if not API_SYNC_CLIENT and self.client.app_version.major >= 4:
+            self.async_client = AsyncGradioClient(self.client.src_prefixed, self.hf_token, self.max_concurrency)
+
+    def probe(self):
+        if not self.client:
+            self.connect()
+            return
+
+        headers = {"Authorization": f"Bearer {self.hf_token}"} if self.hf_token else None
+        response = requests.get(self.url.rstrip("/") + "/config", headers=headers,
+                                timeout=API_HEALTH_CHECK_TIMEOUT)
+        response.raise_for_status()
+
+    async def close(self):
+        if self.async_client:
+            await self.async_client.close()
+
+    # Function to send audio to space, returns space outputs
+    async def predict(self, audio_path: str, diarize: bool):
+        if self.async_client:
+            audio = await self.async_client.upload(audio_path)
+            return await self.async_client.predict("/predict", audio, "transcribe", diarize)
+
+        # Blocking client uploads only files wrapped by handle_file, plain path is sent as string
+        from gradio_client import handle_file
+        return await to_executor(get_api_executor(), self.client.predict, handle_file(audio_path), "transcribe",
+                                 diarize, api_name="/predict")
+
+    async def transcribe(self, audio_path: str):
+        return normalize_result(await self.predict(audio_path, False))
+
+    # Space returns text with timestamps when the last argument is set
+    async def transcribe_segments(self, audio_path: str):
+        return normalize_segments(await self.predict(audio_path, True))
+
+    async def diarize(self, audio_path: str):
+        return normalize_result(await self.predict(audio_path, True))
+
+
+# Local CPU engine, runs speech model in process pool with preloaded models
+class LocalBackend(Backend):
+    overflow = True
+
+    def __init__(self, mode: str, model_spec: str, processes: int):
+        super().__init__(mode, f"local:{model_spec}", processes)
+        self.model_spec = model_spec
+        self.processes = processes
+        self.executor = None
+        self.connect_lock = threading.Lock()
+
+    # Start worker processes and wait until all of them loaded the model
+    # Locked as shared backend may be connected by several pools at once
+    def connect(self):
+        with self.connect_lock:
+            if self.executor:
+                return
+
+            self.executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=local_engine.load_model, initargs=(self.model_spec,))
+            try:
+                warmup = [self.executor.submit(local_engine.ping) for _ in range(self.processes)]
+                for future in warmup:
+                    future.result()
+            except Exception:
+                self.shutdown()
+                raise
+
+    # Function to stop worker processes
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def close(self):
+        self.shutdown()
+
+    def probe(self):
+        if not self.executor:
+            self.connect()
+            return
+
+        try:
+            self.executor.submit(local_engine.ping).result(timeout=API_HEALTH_CHECK_TIMEOUT)
+        except Exception:
+            # Broken pool is restarted on the next probe
+            self.shutdown()
+            raise
+
+    # Function to run engine function in worker processes
+    # Fails if pool is stopped, None executor would run it in default thread pool without model
+    async def run(self, func, audio_path: str):
+        executor = self.executor
+        if not executor:
+            raise BackendUnavailableError(self.name)
+
+        return await asyncio.get_running_loop().run_in_executor(executor, func, audio_path)
+
+    async def transcribe(self, audio_path: str):
+        return normalize_result(await self.run(local_engine.transcribe, audio_path))
+
+    async def transcribe_segments(self, audio_path: str):
+        return normalize_segments(await self.run(local_engine.transcribe, audio_path))
+
+    async def diarize(self, audio_path: str):
+        return normalize_result(await self.run(local_engine.diarize, audio_path))
+
+
+# Notified when any backend slot is released, shared as backends may serve multiple pools
+backends_condition = asyncio.Condition()
+
+
+# Pool of backends for one API mode with least-loaded routing, retries and circuit breakers
+class BackendPool:
+    def __init__(self, mode: str, backends: list):
+        self.mode = mode
+        self.backends = backends
+        self.condition = backends_condition
+
+        # Backends of the other mode pool, used only when they are idle
+        self.borrowed = []
+
+        # Number of requests waiting for free backend
+        self.waiting = 0
+
+        # Requests wait for backends until the first connection attempt is finished
+        self.connecting = True
+
+        # Set while health loop runs, it reconnects backends that failed to connect
+        self.reconnecting = False
+
+        # Request time per audio second samples for hedged requests
+        self.latencies = deque(maxlen=HEDGE_SAMPLES)
+
+    # Check if pool has at least one connected backend
+    def is_connected(self):
+        return any(backend.healthy for backend in self.backends)
+
+    # Check if backends able to serve the call may still be connected
+    def is_connect_pending(self, call: str = None):
+        return self.connecting or (self.reconnecting and
+                                   any(not backend.healthy for backend in self.get_call_backends(call)))
+
+    # Check if pool can take requests: connected or still connecting
+    def accepts_requests(self):
+        return bool(self.backends) and (self.is_connected() or self.is_connect_pending())
+
+    # Get backends of this pool, without borrowed ones
+    def owned(self):
+        return [backend for backend in self.backends if backend not in self.borrowed]
+
+    # Get total concurrency of all backends, borrowed backends take one request at once
+    def capacity(self):
+        return sum(backend.max_concurrency for backend in self.owned()) + len(self.borrowed)
+
+    # Function to let this pool use backend of the other pool when it is idle
+    def borrow(self, backend: Backend):
+        self.borrowed.append(backend)
+        self.backends.append(backend)
+
+    # Check if borrowed backend is idle and its own pool has no waiting requests
+    def can_borrow(self, backend: Backend):
+        return backend.active == 0 and not backend.pool.waiting
+
+    # Function to connect one backend in background thread
+    async def connect_backend(self, backend: Backend):
+        try:
+            await to_thread(backend.connect)
+            await self.set_healthy(backend, True)
+        except Exception as e:
+            logger.error(BACKEND_CONNECT_ERROR.format(self.mode, backend.name, str(e)))
+
+    # Function to connect all backends at once, wakes up requests waiting for connection
+    async def connect(self):
+        await asyncio.gather(*(self.connect_backend(backend) for backend in self.owned()))
+        self.connecting = False
+        async with self.condition:
+            self.condition.notify_all()
+
+    # Get backends able to serve the call
+    def get_call_backends(self, call: str = None):
+        if call == "transcribe_segments":
+            return [backend for backend in self.backends if backend.segments_supported]
+
+        return self.backends
+
+    # Check if any backend returns segments with timestamps
+    def supports_segments(self):
+        return bool(self.get_call_backends("transcribe_segments"))
+
+    # Function to get least loaded healthy backend with free slot, borrowed and overflow backends are the last
+    def least_loaded(self, exclude: Backend = None, call: str = None):
+        available = [backend for backend in self.get_call_backends(call) if backend.is_available()
+                     and backend is not exclude and (backend not in self.borrowed or self.can_borrow(backend))]
+        if not available:
+            return None
+
+        return min(available, key=lambda backend: (backend.overflow, backend in self.borrowed, backend.load))
+
+    # Function to set backend health and wake up waiting requests
+    async def set_healthy(self, backend: Backend, healthy: bool):
+        if backend.healthy == healthy:
+            return
+
+        backend.healthy = healthy
+        if healthy:
+            logger.info(BACKEND_HEALTHY.format(self.mode, backend.name))
+        else:
+            logger.warning(BACKEND_UNHEALTHY.format(self.mode, backend.name))
+
+        async with self.condition:
+            self.condition.notify_all()
+
+    # Function to release backend slot and wake up waiting requests
+    async def release(self, backend: Backend):
+        async with self.condition:
+            backend.active -= 1
+            self.condition.notify_all()
+
+    # Acquire slot on least loaded backend, waits until any backend is free
+    # Waits up to API_CONNECT_WAIT for backends being connected, fails fast if all backends are down
+    @asynccontextmanager
+    async def slot(self, call: str = None):
+        deadline = time.monotonic() + API_CONNECT_WAIT
+        async with self.condition:
+            while True:
+                # Wake up periodically, open circuits become half-open by timeout
+                timeout = CIRCUIT_BREAKER_TIMEOUT
+                if not any(backend.is_serviceable() for backend in self.get_call_backends(call)):
+                    timeout = min(timeout, deadline - time.monotonic())
+                    if not self.is_connect_pending(call) or timeout <= 0:
+                        raise BackendUnavailableError(self.mode)
+
+                backend = self.least_loaded(call=call)
+                if backend:
+                    break
+
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(self.condition.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    self.waiting -= 1
+
+            backend.active += 1
+
+        try:
+            yield backend
+        finally:
+            await self.release(backend)
+
+    # Function to call backend once, updates circuit breaker and latency stats
+    async def call_backend(self, backend: Backend, call: str, audio_path: str, cost: float):
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(getattr(backend, call)(audio_path), API_REQUEST_TIMEOUT)
+
+            # Diarize backend serving transcribe request
+            if backend in self.borrowed:
+                if call == "transcribe":
+                    result = strip_speaker_labels(result)
+                elif call == "transcribe_segments":
+                    for segment in result:
+                        segment["text"] = strip_speaker_labels(segment["text"])
+        except SegmentsUnsupportedError:
+            backend.segments_supported = False
+            logger.warning(BACKEND_NO_SEGMENTS.format(self.mode, backend.name))
+            raise
+        except Exception as e:
+            if is_transient_error(e) and backend.breaker.record_failure():
+                logger.warning(BACKEND_CIRCUIT_OPEN.format(self.mode, backend.name, CIRCUIT_BREAKER_TIMEOUT))
+            raise
+
+        backend.breaker.record_success()
+        self.latencies.append((time.monotonic() - start) / max(cost, 1))
+        return result
+
+    # Get time after which duplicate request is sent, None if hedging is disabled
+    def get_hedge_delay(self, cost: float):
+        if not API_HEDGE_PERCENTILE or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+
+        samples = sorted(self.latencies)
+        index = min(len(samples) - 1, int(len(samples) * API_HEDGE_PERCENTILE / 100))
+        return samples[index] * max(cost, 1)
+
+    # Function to call backend, sends duplicate request to another idle backend if it is too slow
+    async def hedged_call(self, call: str, audio_path: str, cost: float):
+        async with self.slot(call) as backend:
+            primary = asyncio.create_task(self.call_backend(backend, call, audio_path, cost))
+            delay = self.get_hedge_delay(cost)
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+
+            hedge_backend = None
+            if not primary.done() and delay is not None:
+                async with self.condition:
+                    hedge_backend = self.least_loaded(exclude=backend, call=call)
+                    if hedge_backend:
+                        hedge_backend.active += 1
+
+            if not hedge_backend:
+                return await primary
+
+            logger.info(BACKEND_HEDGE.format(self.mode, backend.name, hedge_backend.name))
+            hedge = asyncio.create_task(self.call_backend(hedge_backend, call, audio_path, cost))
+            try:
+                pending = {primary, hedge}
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if not task.exception():
+                            return task.result()
+
+                # Both failed
+                return primary.result()
+            finally:
+                for task in (primary, hedge):
+                    task.cancel()
+                await self.release(hedge_backend)
+
+    # Function to send request with retries of transient errors
+    # call is backend method name: "transcribe" or "diarize"
+    async def request(self, call: str, audio_path: str, cost: float = 0):
+        attempt = 0
+        while True:
+            try:
+                return await self.hedged_call(call, audio_path, cost)
+            except Exception as e:
+                if attempt >= API_RETRIES or not is_transient_error(e):
+                    raise
+
+                delay = get_backoff_delay(attempt)
+                logger.warning(BACKEND_RETRY.format(self.mode, attempt + 1, API_RETRIES, delay, str(e)))
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    # Function to release resources of all backends
+    async def close(self):
+        for backend in self.owned():
+            await backend.close()
+
+    # Function to probe one backend, reconnects it if it was not connected
+    async def probe_backend(self, backend: Backend):
+        try:
+            await to_thread(backend.probe)
+            await self.set_healthy(backend, True)
+        except Exception as e:
+            logger.error(BACKEND_PROBE_ERROR.format(self.mode, backend.name, str(e)))
+            await self.set_healthy(backend, False)
+
+    # Function to probe all backends once
+    async def health_check(self):
+        await asyncio.gather(*(self.probe_backend(backend) for backend in self.owned()))
+
+    # Function to connect backends and then periodically probe them, dead backends are retried more often
+    async def health_loop(self):
+        self.reconnecting = True
+        try:
+            await self.connect()
+            while True:
+                healthy = all(backend.healthy for backend in self.owned())
+                await asyncio.sleep(API_HEALTH_CHECK_INTERVAL if healthy else API_RECONNECT_INTERVAL)
+                await self.health_check()
+        finally:
+            self.reconnecting = False
+
+
+# Shared local engine, one process pool serves all modes
+local_backend = None
+
+
+# Function to create backends pool for API mode from config
+def create_backend_pool(mode: str, urls: list, hf_tokens: list, concurrency: list):
+    global local_backend
+    backends = []
+    for i, url in enumerate(urls):
+        hf_token = hf_tokens[i] if i < len(hf_tokens) else None
+        max_concurrency = concurrency[i] if i < len(concurrency) else 1
+        backends.append(GradioBackend(mode, url, hf_token, max_concurrency))
+
+    if LOCAL_ENGINE_WORKERS and LOCAL_ENGINE_MODEL and mode in LOCAL_ENGINE_MODES:
+        if not local_backend:
+            local_backend = LocalBackend("local", LOCAL_ENGINE_MODEL, LOCAL_ENGINE_WORKERS)
+        backends.append(local_backend)
+
+    pool = BackendPool(mode, backends)
+    for backend in backends:
+        if backend is not local_backend:
+            backend.pool = pool
+
+    return pool
+
+
+# Function to lend spaces of one pool to the other, flags are set for each space in order of urls
+def lend_backends(owner: BackendPool, borrower: BackendPool, flags: list):
+    spaces = [backend for backend in owner.owned() if isinstance(backend, GradioBackend)]
+    for backend, flag in zip(spaces, flags):
+        if flag:
+            borrower.borrow(backend)
+
+
+# Get part of concurrency cap for one of worker processes, remainder goes to processes shifted by offset
+def get_process_share(total: int, index: int, count: int, offset: int = 0):
+    return total // count + (1 if (index + offset) % count < total % count else 0)
+
+
+# Function to split concurrency caps of backends between worker processes, caps hold for all processes together
+# Backends left without share in this process are removed from pools
+def share_backends(pools: list, index: int, count: int):
+    backends = []
+    for pool in pools:
+        backends.extend(backend for backend in pool.owned() if backend not in backends)
+
+    for offset, backend in enumerate(backends):
+        backend.max_concurrency = get_process_share(backend.max_concurrency, index, count, offset)
+        if isinstance(backend, LocalBackend):
+            backend.processes = backend.max_concurrency
+
+    for pool in pools:
+        pool.backends = [backend for backend in pool.backends if backend.max_concurrency > 0]
+        pool.borrowed = [backend for backend in pool.borrowed if backend.max_concurrency > 0]
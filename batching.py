@@ -0,0 +1,97 @@
+import time
+import asyncio
+
+from logger import logger
+from messages.log.batching import BATCH_DONE
+from audio import get_duration, concat_with_silence
+from chunking import is_chunking_needed
+from process_file import create_spool_file, remove_spool_file
+from config import BATCH_MAX_JOBS, BATCH_MAX_SECONDS, BATCH_WAIT, BATCH_SEPARATOR_SECONDS
+
+
+# How often queue is checked for new jobs while batch is collected
+BATCH_POLL_INTERVAL = 0.02
+
+# Batching statistics: jobs sent in batches and all batchable jobs
+batched_jobs = 0
+total_jobs = 0
+
+
+# Error of splitting batch result back to jobs
+class BatchSplitError(Exception):
+    pass
+
+
+# Check if the job is short enough to be batched with others
+def is_batchable(job):
+    return (bool(BATCH_MAX_JOBS) and BATCH_MAX_JOBS > 1 and not job.diarize and 0 < job.cost <= BATCH_MAX_SECONDS
+            and not is_chunking_needed(job))
+
+
+# Function to collect batch: takes short jobs from the queue until it is full or wait time is over
+async def collect_batch(queue, job):
+    jobs = [job]
+    deadline = time.monotonic() + BATCH_WAIT
+    while len(jobs) < BATCH_MAX_JOBS:
+        next_job = queue.peek()
+        if next_job and is_batchable(next_job):
+            jobs.append(queue.get_nowait())
+            continue
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        await asyncio.sleep(min(remaining, BATCH_POLL_INTERVAL))
+
+    return jobs
+
+
+# Function to update and log batching statistics, batched is False for jobs sent one by one
+def record_batch(size: int, batched: bool):
+    global batched_jobs, total_jobs
+    total_jobs += size
+    if batched:
+        batched_jobs += size
+        logger.info(BATCH_DONE.format(size, batched_jobs, total_jobs, batched_jobs / total_jobs))
+
+
+# Function to split segments of joined audio back to files by their offsets
+# Segment belongs to the file its middle is in, segments covering two files can't be split
+def split_segments(segments: list, bounds: list):
+    texts = [[] for _ in bounds]
+    tolerance = BATCH_SEPARATOR_SECONDS / 2
+    for segment in segments:
+        middle = (segment["start"] + segment["end"]) / 2
+        index = 0
+        while index < len(bounds) - 1 and middle > bounds[index][1] + tolerance:
+            index += 1
+
+        start, end = bounds[index]
+        if segment["start"] < start - tolerance or segment["end"] > end + tolerance:
+            raise BatchSplitError(f"segment {segment['start']:.1f}-{segment['end']:.1f} covers two files")
+
+        if segment["text"]:
+            texts[index].append(segment["text"])
+
+    return [" ".join(text) for text in texts]
+
+
+# Function to transcribe several short jobs in one request, returns texts in order of jobs
+async def transcribe_batch(pool, jobs: list):
+    durations = await asyncio.gather(*(get_duration(job.audio_path) for job in jobs))
+
+    bounds = []
+    offset = 0
+    for duration in durations:
+        bounds.append((offset, offset + duration))
+        offset += duration + BATCH_SEPARATOR_SECONDS
+
+    path = create_spool_file(".flac")
+    try:
+        await concat_with_silence([job.audio_path for job in jobs], path, BATCH_SEPARATOR_SECONDS)
+        segments = await pool.request("transcribe_segments", path, sum(durations))
+    finally:
+        remove_spool_file(path)
+
+    return split_segments(segments, bounds)
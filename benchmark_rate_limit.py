@@ -0,0 +1,79 @@
+import sys
+import time
+import random
+import tracemalloc
+from collections import defaultdict, deque
+
+from rate_limiter import RateLimiter
+
+
+# Microbenchmark of per user rate limiter: python benchmark_rate_limit.py [users] [requests]
+# Compares GCRA limiter with sliding window of timestamps used before
+LIMIT = 10
+PERIOD = 60
+
+
+# Old limiter: deque of request timestamps for each user
+class SlidingWindowLimiter:
+    def __init__(self, limit: int, period: float):
+        self.limit = limit
+        self.period = period
+        self.queues = defaultdict(deque)
+
+    def check(self, key, now: float):
+        queue = self.queues[key]
+        while queue and now - queue[0] > self.period:
+            queue.popleft()
+
+        if len(queue) >= self.limit:
+            return False
+
+        queue.append(now)
+        return True
+
+    def __len__(self):
+        return len(self.queues)
+
+
+# Function to run checks with simulated clock, returns (seconds per check, allowed, memory in bytes)
+# Time and memory are measured in separate runs, tracing allocations slows checks down
+def run(create_limiter, requests: list):
+    limiter = create_limiter()
+    allowed = 0
+    start = time.perf_counter()
+    for key, now in requests:
+        result = limiter.check(key, now)
+        if result is True or (isinstance(result, tuple) and result[0]):
+            allowed += 1
+
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    limiter = create_limiter()
+    for key, now in requests:
+        limiter.check(key, now)
+
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed / len(requests), allowed, memory, limiter
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+
+    # Requests over one hour, some users send bursts
+    random.seed(0)
+    duration = 3600
+    requests = sorted(((random.randrange(users) if random.random() < 0.8 else random.randrange(100),
+                        random.uniform(0, duration)) for _ in range(count)), key=lambda request: request[1])
+
+    print(f"{users} users, {count} requests, limit {LIMIT} per {PERIOD} seconds")
+    for name, limiter_class in (("sliding window", SlidingWindowLimiter), ("gcra", RateLimiter)):
+        per_check, allowed, memory, limiter = run(lambda: limiter_class(LIMIT, PERIOD), requests)
+        print(f"{name:>15}: {per_check * 1e9:5.0f} ns/check, {allowed} allowed, {len(limiter)} users kept, "
+              f"{memory / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,65 @@
 import asyncio
+import secrets
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
 from logger import logger
 from bot_init import bot, dp
 from handlers import *
-from messages.log.other import APP_START, APP_ERROR
-from api import diarize_queue_process, transcribe_queue_process
+from messages.log.other import APP_START, APP_ERROR, WEBHOOK_STARTED, POLLING_STARTED
+from api import start_queue_workers, stop_queue_workers
+from broker import start_ingress, start_worker_processes, stop_worker_processes
+from config import SPLIT_PROCESSES, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT
+
+
+# Function to receive updates with long polling
+async def start_polling(allowed_updates: list):
+    # Telegram doesn't allow polling while webhook is set
+    await bot.delete_webhook()
+    logger.info(POLLING_STARTED.format(", ".join(allowed_updates)))
+    await dp.start_polling(bot, allowed_updates=allowed_updates)
+
+
+# Function to receive updates with webhook on local aiohttp server
+# Requests without secret token are rejected, random secret is used if it is not set
+async def start_webhook(allowed_updates: list):
+    secret_token = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret_token).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        await bot.set_webhook(WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH, secret_token=secret_token,
+                              allowed_updates=allowed_updates)
+        logger.info(WEBHOOK_STARTED.format(WEBHOOK_HOST, WEBHOOK_PORT, ", ".join(allowed_updates)))
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 
 
 async def main():
     logger.info(APP_START)
     try:
-        asyncio.create_task(diarize_queue_process())
-        asyncio.create_task(transcribe_queue_process())
-        await dp.start_polling(bot)
+        if SPLIT_PROCESSES:
+            start_worker_processes()
+            start_ingress()
+        else:
+            start_queue_workers()
+
+        # Receive only update types handlers are registered for
+        allowed_updates = dp.resolve_used_update_types()
+        if WEBHOOK_URL:
+            await start_webhook(allowed_updates)
+        else:
+            await start_polling(allowed_updates)
     except Exception as e:
         logger.error(APP_ERROR.format(str(e)))
+    finally:
+        await stop_queue_workers()
+        stop_worker_processes()
 
 
 if __name__ == "__main__":
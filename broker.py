@@ -0,0 +1,153 @@
+import signal
+import asyncio
+import multiprocessing
+
+from logger import logger
+from jobs import Job
+from messages.log.broker import WORKER_PROCESS_STARTED, WORKER_PROCESS_STOPPED, WORKER_PROCESSES_STARTED, \
+                                WORKER_PROCESS_DIED
+from job_store import claim_stored_jobs, release_claimed_jobs, remove_stored_job, job_store_loop
+from inflight import start_inflight_request
+from process_file import remove_spool_file
+from backends import share_backends, get_process_share
+from api import transcribe_pool, diarize_pool, transcribe_request_queue, diarize_request_queue, worker_tasks, \
+                start_queue_workers, stop_queue_workers, prepare_stored_job, fail_stored_job, deliver_inflight_result
+from config import WORKER_PROCESSES, BROKER_POLL_INTERVAL, TRANSCRIBE_WORKERS, DIARIZE_WORKERS
+
+
+# How often bot process checks that worker processes are alive
+SUPERVISE_INTERVAL = 5
+
+# Seconds to wait for worker process to finish its jobs store writes on stop
+WORKER_STOP_TIMEOUT = 30
+
+
+# Worker processes started by bot process in split mode
+worker_processes = []
+
+# Tasks delivering result to duplicate jobs
+delivery_tasks = set()
+
+
+# Function to start bot process in split mode, it only writes jobs to job store and watches worker processes
+def start_ingress():
+    worker_tasks.append(asyncio.create_task(job_store_loop()))
+    worker_tasks.append(asyncio.create_task(supervise_worker_processes()))
+
+
+# Function to send result of the job to its duplicate claimed together with it
+async def deliver_duplicate(job: Job, inflight: asyncio.Future):
+    remove_spool_file(job.audio_path)
+    await deliver_inflight_result(job.msg, inflight, job.diarize)
+    remove_stored_job(job)
+
+
+# Function to move jobs from job store to local queue while there are idle queue workers
+# Duplicates of the job are claimed with it and get its result
+async def broker_loop(worker_id: str, queue, diarize: bool):
+    while True:
+        if queue.qsize() >= queue.idle_workers:
+            await asyncio.sleep(BROKER_POLL_INTERVAL)
+            continue
+
+        jobs = await claim_stored_jobs(worker_id, diarize)
+        if not jobs:
+            await asyncio.sleep(BROKER_POLL_INTERVAL)
+            continue
+
+        job, duplicates = jobs[0], jobs[1:]
+        try:
+            await prepare_stored_job(job)
+        except Exception as e:
+            for failed_job in jobs:
+                await fail_stored_job(failed_job, e)
+            continue
+
+        if duplicates:
+            job.inflight = start_inflight_request(job.file_unique_id, diarize)
+            for duplicate in duplicates:
+                task = asyncio.create_task(deliver_duplicate(duplicate, job.inflight))
+                delivery_tasks.add(task)
+                task.add_done_callback(delivery_tasks.discard)
+
+        await queue.put(job)
+
+
+# Function to run worker process, jobs left claimed by previous run are returned to the queue first
+# Concurrency caps of spaces and local engine are split between index-th of count processes
+async def run_worker(worker_id: str, index: int = 0, count: int = 1):
+    logger.info(WORKER_PROCESS_STARTED.format(worker_id))
+    await release_claimed_jobs(worker_id)
+
+    # SIGTERM stops process gracefully, so finished jobs are removed from job store
+    stop_event = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop_event.set)
+    except NotImplementedError:
+        pass
+
+    share_backends([transcribe_pool, diarize_pool], index, count)
+    start_queue_workers(TRANSCRIBE_WORKERS and get_process_share(TRANSCRIBE_WORKERS, index, count),
+                        DIARIZE_WORKERS and get_process_share(DIARIZE_WORKERS, index, count))
+    for pool, queue, diarize in ((transcribe_pool, transcribe_request_queue, False),
+                                 (diarize_pool, diarize_request_queue, True)):
+        if pool.backends:
+            worker_tasks.append(asyncio.create_task(broker_loop(worker_id, queue, diarize)))
+
+    try:
+        await stop_event.wait()
+    finally:
+        await stop_queue_workers()
+        logger.info(WORKER_PROCESS_STOPPED.format(worker_id))
+
+
+# Worker process entry point
+def worker_process(worker_id: str, index: int = 0, count: int = 1):
+    try:
+        asyncio.run(run_worker(worker_id, index, count))
+    except KeyboardInterrupt:
+        pass
+
+
+# Function to start index-th worker process, names are stable to release their jobs after restart
+def start_worker_process(index: int):
+    worker_id = f"worker-{index + 1}"
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(target=worker_process, args=(worker_id, index, WORKER_PROCESSES), name=worker_id)
+    process.start()
+    return process
+
+
+# Function to start worker processes
+def start_worker_processes():
+    for i in range(WORKER_PROCESSES):
+        worker_processes.append(start_worker_process(i))
+
+    logger.info(WORKER_PROCESSES_STARTED.format(len(worker_processes)))
+
+
+# Function to restart dead worker processes, their claimed jobs are returned to the queue at once
+async def supervise_worker_processes():
+    while True:
+        await asyncio.sleep(SUPERVISE_INTERVAL)
+        for i, process in enumerate(worker_processes):
+            if process.is_alive():
+                continue
+
+            logger.error(WORKER_PROCESS_DIED.format(process.name, process.exitcode))
+            await release_claimed_jobs(process.name)
+            worker_processes[i] = start_worker_process(i)
+
+
+# Function to stop worker processes, unfinished jobs stay in job store
+def stop_worker_processes():
+    for process in worker_processes:
+        process.terminate()
+
+    for process in worker_processes:
+        process.join(WORKER_STOP_TIMEOUT)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    worker_processes.clear()
@@ -0,0 +1,139 @@
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+
+from logger import logger
+from messages.log.cache import CACHE_DB_OPEN_ERROR, CACHE_DB_READ_ERROR, CACHE_DB_WRITE_ERROR
+from utils import to_thread
+from config import RESULT_CACHE_SIZE, RESULT_CACHE_TTL, RESULT_CACHE_FILENAME, RESULT_CACHE_MAX_ENTRIES
+
+
+# In-memory LRU tier: key -> (timestamp, result)
+memory_cache = OrderedDict()
+memory_cache_semaphore = asyncio.Semaphore(1)
+
+# Persistent SQLite tier, shared between executor threads
+db_lock = threading.Lock()
+db_connection = None
+
+# Trim the database every N inserts instead of on every write
+DB_TRIM_INTERVAL = 50
+db_inserts = 0
+
+
+if RESULT_CACHE_FILENAME:
+    try:
+        db_connection = sqlite3.connect(RESULT_CACHE_FILENAME, check_same_thread=False)
+        db_connection.execute("CREATE TABLE IF NOT EXISTS results ("
+                              "key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL)")
+        db_connection.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+        db_connection.commit()
+    except Exception as e:
+        db_connection = None
+        logger.error(CACHE_DB_OPEN_ERROR.format(str(e)))
+
+
+# Function to build cache key from file unique id and mode
+def get_cache_key(file_unique_id: str, diarize: bool):
+    return f"{'diarize' if diarize else 'transcribe'}:{file_unique_id}"
+
+
+# Check if cached entry is expired
+def is_expired(created: float):
+    return bool(RESULT_CACHE_TTL) and time.time() - created > RESULT_CACHE_TTL
+
+
+# Function to read result from the database (blocking)
+def db_get(key: str):
+    with db_lock:
+        row = db_connection.execute("SELECT result, created FROM results WHERE key = ?", (key,)).fetchone()
+
+    return row
+
+
+# Function to write result to the database and evict old entries (blocking)
+def db_set(key: str, result: str, created: float):
+    global db_inserts
+    with db_lock:
+        db_connection.execute("INSERT OR REPLACE INTO results (key, result, created) VALUES (?, ?, ?)",
+                              (key, result, created))
+
+        db_inserts += 1
+        if db_inserts % DB_TRIM_INTERVAL == 0:
+            if RESULT_CACHE_TTL:
+                db_connection.execute("DELETE FROM results WHERE created < ?", (time.time() - RESULT_CACHE_TTL,))
+            if RESULT_CACHE_MAX_ENTRIES:
+                db_connection.execute("DELETE FROM results WHERE key NOT IN "
+                                      "(SELECT key FROM results ORDER BY created DESC LIMIT ?)",
+                                      (RESULT_CACHE_MAX_ENTRIES,))
+
+        db_connection.commit()
+
+
+# Function to put result to the in-memory tier
+async def memory_set(key: str, result: str, created: float):
+    async with memory_cache_semaphore:
+        memory_cache[key] = (created, result)
+        memory_cache.move_to_end(key)
+        while len(memory_cache) > RESULT_CACHE_SIZE:
+            memory_cache.popitem(last=False)
+
+
+# Function to get cached result, returns None on miss
+async def get_cached_result(file_unique_id: str, diarize: bool):
+    if not file_unique_id:
+        return None
+
+    key = get_cache_key(file_unique_id, diarize)
+
+    if RESULT_CACHE_SIZE:
+        async with memory_cache_semaphore:
+            entry = memory_cache.get(key)
+            if entry:
+                created, result = entry
+                if not is_expired(created):
+                    memory_cache.move_to_end(key)
+                    return result
+
+                del memory_cache[key]
+
+    if not db_connection:
+        return None
+
+    try:
+        row = await to_thread(db_get, key)
+    except Exception as e:
+        logger.error(CACHE_DB_READ_ERROR.format(str(e)))
+        return None
+
+    if not row:
+        return None
+
+    result, created = row
+    if is_expired(created):
+        return None
+
+    if RESULT_CACHE_SIZE:
+        await memory_set(key, result, created)
+
+    return result
+
+
+# Function to save result to all cache tiers
+async def save_cached_result(file_unique_id: str, diarize: bool, result: str):
+    if not file_unique_id or result is None:
+        return
+
+    key = get_cache_key(file_unique_id, diarize)
+    created = time.time()
+
+    if RESULT_CACHE_SIZE:
+        await memory_set(key, result, created)
+
+    if db_connection:
+        try:
+            await to_thread(db_set, key, result, created)
+        except Exception as e:
+            logger.error(CACHE_DB_WRITE_ERROR.format(str(e)))
@@ -0,0 +1,141 @@
+import re
+import math
+import asyncio
+
+from logger import logger
+from messages.log.chunking import CHUNKING_ERROR, CHUNKING_PLAN
+from audio import get_duration, detect_silences, extract_fragment
+from process_file import create_spool_file, remove_spool_file
+from config import CHUNK_SECONDS, CHUNK_MIN_SECONDS, CHUNK_OVERLAP_SECONDS, CHUNK_SILENCE_THRESHOLD, \
+                    CHUNK_SILENCE_DURATION
+
+
+# Fast speech rate, limits number of words that fit into overlap of two chunks
+OVERLAP_WORDS_PER_SECOND = 4
+
+# Max number of words compared when removing duplicated text of the overlaps
+MAX_OVERLAP_WORDS = math.ceil(2 * CHUNK_OVERLAP_SECONDS * OVERLAP_WORDS_PER_SECOND)
+
+# Single word repeated at the boundary is likely spoken twice, not duplicated by the overlap
+MIN_OVERLAP_WORDS = 2
+
+
+# Check if the job is long enough to be split into chunks
+def is_chunking_needed(job):
+    return bool(CHUNK_SECONDS) and not job.diarize and job.cost > CHUNK_MIN_SECONDS
+
+
+# Function to plan chunks (start, end), cuts at the longest silence in the second half of every chunk
+def plan_chunks(duration: float, silences: list, chunk_seconds: float, overlap: float):
+    cuts = []
+    position = 0
+    while duration - position > chunk_seconds:
+        window_start = position + chunk_seconds / 2
+        window_end = position + chunk_seconds
+        candidates = [(end - start, (start + end) / 2) for start, end in silences
+                      if window_start <= (start + end) / 2 <= window_end]
+
+        # Longest silence, the latest one if equal. Hard cut if no silence found
+        cut = max(candidates)[1] if candidates else window_end
+        cuts.append(cut)
+        position = cut
+
+    bounds = [0] + cuts + [duration]
+    return [(max(0, bounds[i] - overlap), min(duration, bounds[i + 1] + overlap)) for i in range(len(bounds) - 1)]
+
+
+# Normalize word for overlap comparison
+def normalize_word(word: str):
+    return re.sub(r"\W", "", word.lower())
+
+
+# Function to get number of words repeated at the end of previous text and start of the next one
+def get_overlap_length(previous: list, following: list):
+    previous_norm = [normalize_word(word) for word in previous[-MAX_OVERLAP_WORDS:]]
+    following_norm = [normalize_word(word) for word in following[:MAX_OVERLAP_WORDS]]
+    for length in range(min(len(previous_norm), len(following_norm)), MIN_OVERLAP_WORDS - 1, -1):
+        if previous_norm[-length:] == following_norm[:length]:
+            return length
+
+    return 0
+
+
+# Function to join chunks texts in order removing duplicated overlap words
+def merge_transcripts(texts: list):
+    words = []
+    for text in texts:
+        chunk_words = text.split()
+        words.extend(chunk_words[get_overlap_length(words, chunk_words):])
+
+    return " ".join(words)
+
+
+# Function to split audio file into chunks files, returns list of paths
+async def split_audio(job):
+    duration = job.duration or await get_duration(job.audio_path)
+    silences = await detect_silences(job.audio_path, CHUNK_SILENCE_THRESHOLD, CHUNK_SILENCE_DURATION)
+    chunks = plan_chunks(duration, silences, CHUNK_SECONDS, CHUNK_OVERLAP_SECONDS)
+    logger.info(CHUNKING_PLAN.format(job.user_id, job.chat_id, job.username, job.file_id, len(chunks)))
+
+    paths = []
+    try:
+        for start, end in chunks:
+            path = create_spool_file(".flac")
+            paths.append(path)
+            await extract_fragment(job.audio_path, path, start, end - start)
+    except BaseException:
+        for path in paths:
+            remove_spool_file(path)
+        raise
+
+    return paths
+
+
+# Function to transcribe long audio by chunks in parallel on backends pool
+# Falls back to single request if audio can't be split
+# on_progress is called with text of chunks completed in order
+async def transcribe_chunked(pool, job, on_progress=None):
+    try:
+        paths = await split_audio(job)
+    except Exception as e:
+        logger.error(CHUNKING_ERROR.format(job.user_id, job.chat_id, job.username, job.file_id, str(e)))
+        return await pool.request("transcribe", job.audio_path, job.cost)
+
+    texts = [None] * len(paths)
+    completed = 0
+    failed = False
+    chunk_cost = job.cost / len(paths)
+
+    # Each chunk takes its own backend slot
+    async def transcribe_chunk(i: int, path: str):
+        nonlocal completed, failed
+        try:
+            texts[i] = await pool.request("transcribe", path, chunk_cost)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            remove_spool_file(path)
+
+        # Report progress when the first unfinished chunks are done, no progress after any chunk failed
+        if on_progress and not failed and i == completed:
+            while completed < len(texts) and texts[completed] is not None:
+                completed += 1
+
+            if completed < len(texts):
+                await on_progress(merge_transcripts(texts[:completed]))
+
+    # The first failed chunk fails the job, other chunks are cancelled and free their backend slots
+    tasks = [asyncio.create_task(transcribe_chunk(i, path)) for i, path in enumerate(paths)]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception():
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return merge_transcripts(texts)
@@ -10,10 +10,45 @@ TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 COMMAND_TRANSCRIBE = os.getenv('COMMAND_TRANSCRIBE')
 COMMAND_DIARIZE = os.getenv('COMMAND_DIARIZE')
 INSTANT_REPLY_IN_GROUPS = bool(os.getenv('INSTANT_REPLY_IN_GROUPS'))
+
+# Webhook mode instead of long polling
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH') or "/webhook"
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or None
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST') or "0.0.0.0"
+WEBHOOK_PORT = os.getenv('WEBHOOK_PORT')
 API_URL_TRANSCRIBE = os.getenv('API_URL_TRANSCRIBE')
 API_URL_DIARIZE = os.getenv('API_URL_DIARIZE')
 HF_TOKEN_TRANSCRIBE = os.getenv('HF_TOKEN_TRANSCRIBE')
 HF_TOKEN_DIARIZE = os.getenv('HF_TOKEN_DIARIZE')
+API_CONCURRENCY_TRANSCRIBE = os.getenv('API_CONCURRENCY_TRANSCRIBE')
+API_CONCURRENCY_DIARIZE = os.getenv('API_CONCURRENCY_DIARIZE')
+API_LEND_TRANSCRIBE = os.getenv('API_LEND_TRANSCRIBE')
+API_LEND_DIARIZE = os.getenv('API_LEND_DIARIZE')
+API_HEALTH_CHECK_INTERVAL = os.getenv('API_HEALTH_CHECK_INTERVAL')
+API_HEALTH_CHECK_TIMEOUT = os.getenv('API_HEALTH_CHECK_TIMEOUT')
+API_RECONNECT_INTERVAL = os.getenv('API_RECONNECT_INTERVAL')
+API_CONNECT_WAIT = os.getenv('API_CONNECT_WAIT')
+
+# API request retries and circuit breaker
+API_REQUEST_TIMEOUT = os.getenv('API_REQUEST_TIMEOUT')
+API_RETRIES = os.getenv('API_RETRIES')
+API_RETRY_BASE_DELAY = os.getenv('API_RETRY_BASE_DELAY')
+API_RETRY_MAX_DELAY = os.getenv('API_RETRY_MAX_DELAY')
+API_HEDGE_PERCENTILE = os.getenv('API_HEDGE_PERCENTILE')
+CIRCUIT_BREAKER_THRESHOLD = os.getenv('CIRCUIT_BREAKER_THRESHOLD')
+CIRCUIT_BREAKER_TIMEOUT = os.getenv('CIRCUIT_BREAKER_TIMEOUT')
+
+# Blocking Gradio client in dedicated threads instead of async HTTP API
+API_SYNC_CLIENT = bool(os.getenv('API_SYNC_CLIENT'))
+API_EXECUTOR_WORKERS = os.getenv('API_EXECUTOR_WORKERS')
+
+# Local CPU engine, used when all API spaces are busy
+LOCAL_ENGINE_WORKERS = os.getenv('LOCAL_ENGINE_WORKERS')
+LOCAL_ENGINE_MODEL = os.getenv('LOCAL_ENGINE_MODEL')
+LOCAL_ENGINE_MODES = os.getenv('LOCAL_ENGINE_MODES')
+LOCAL_ENGINE_MODEL_SIZE = os.getenv('LOCAL_ENGINE_MODEL_SIZE')
+LOCAL_ENGINE_COMPUTE_TYPE = os.getenv('LOCAL_ENGINE_COMPUTE_TYPE')
 
 ADMIN_ID = os.getenv('ADMIN_ID')
 
@@ -23,40 +58,340 @@ LOG_FORMAT = os.getenv('LOG_FORMAT')
 MAX_FILE_SIZE = os.getenv('MAX_FILE_SIZE')
 MAX_DURATION_SECONDS = os.getenv('MAX_DURATION_SECONDS')
 
+# Long audio chunking, chunks are transcribed in parallel
+CHUNK_SECONDS = os.getenv('CHUNK_SECONDS')
+CHUNK_MIN_SECONDS = os.getenv('CHUNK_MIN_SECONDS')
+CHUNK_OVERLAP_SECONDS = os.getenv('CHUNK_OVERLAP_SECONDS')
+CHUNK_SILENCE_THRESHOLD = os.getenv('CHUNK_SILENCE_THRESHOLD')
+CHUNK_SILENCE_DURATION = os.getenv('CHUNK_SILENCE_DURATION')
+
+# Min interval between partial result edits of chunked audio, empty string - disabled
+PROGRESSIVE_EDIT_INTERVAL = os.getenv('PROGRESSIVE_EDIT_INTERVAL')
+
+# Short audio batching, several files are joined into one transcribe request
+BATCH_MAX_JOBS = os.getenv('BATCH_MAX_JOBS')
+BATCH_MAX_SECONDS = os.getenv('BATCH_MAX_SECONDS')
+BATCH_WAIT = os.getenv('BATCH_WAIT')
+BATCH_SEPARATOR_SECONDS = os.getenv('BATCH_SEPARATOR_SECONDS')
+
+# Transcoding of downloaded files before API request
+TRANSCODE_AUDIO = bool(os.getenv('TRANSCODE_AUDIO'))
+EXTRACT_VIDEO_AUDIO = bool(os.getenv('EXTRACT_VIDEO_AUDIO'))
+TRANSCODE_WORKERS = os.getenv('TRANSCODE_WORKERS')
+TRANSCODE_CODEC = os.getenv('TRANSCODE_CODEC') or "libopus"
+TRANSCODE_EXTENSION = os.getenv('TRANSCODE_EXTENSION') or ".ogg"
+TRANSCODE_SAMPLE_RATE = os.getenv('TRANSCODE_SAMPLE_RATE')
+TRANSCODE_BITRATE = os.getenv('TRANSCODE_BITRATE')
+
+# ffmpeg executables
+FFMPEG_PATH = os.getenv('FFMPEG_PATH') or "ffmpeg"
+FFPROBE_PATH = os.getenv('FFPROBE_PATH') or "ffprobe"
+
+# Directory for downloaded files waiting in API queue (system temp dir by default)
+SPOOL_DIR = os.getenv('SPOOL_DIR') or None
+
 MAX_SIMULTANIOUS_REQUESTS = os.getenv('MAX_SIMULTANIOUS_REQUESTS')
 
+# Admission control: reject new files if queued audio can't be processed in time
+ADMISSION_MAX_WAIT = os.getenv('ADMISSION_MAX_WAIT')
+ADMISSION_MAX_BYTES = os.getenv('ADMISSION_MAX_BYTES')
+ADMISSION_DEFER = os.getenv('ADMISSION_DEFER')
+
+# API queues scheduling: fifo, sjf (shortest job first) or fair (round robin between users)
+SCHEDULER = os.getenv('SCHEDULER')
+SCHEDULER_AGING = os.getenv('SCHEDULER_AGING')
+SCHEDULER_BYTES_PER_SECOND = os.getenv('SCHEDULER_BYTES_PER_SECOND')
+FAIR_QUEUE_KEY = os.getenv('FAIR_QUEUE_KEY')
+FAIR_QUEUE_QUANTUM = os.getenv('FAIR_QUEUE_QUANTUM')
+
+# Queued requests replies updates with position and estimated wait
+QUEUE_STATUS_INTERVAL = os.getenv('QUEUE_STATUS_INTERVAL')
+QUEUE_STATUS_MAX_EDITS = os.getenv('QUEUE_STATUS_MAX_EDITS')
+SERVICE_TIME_SMOOTHING = os.getenv('SERVICE_TIME_SMOOTHING')
+
+# Number of concurrent workers for each API queue
+TRANSCRIBE_WORKERS = os.getenv('TRANSCRIBE_WORKERS')
+DIARIZE_WORKERS = os.getenv('DIARIZE_WORKERS')
+
 USER_RATE_LIMIT = os.getenv('USER_RATE_LIMIT')
 USER_REQUEST_TIME = os.getenv('USER_REQUEST_TIME')
 
+# Audio seconds and bytes quotas for users and group chats over rolling windows
+QUOTA_WINDOWS = os.getenv('QUOTA_WINDOWS')
+QUOTA_USER_SECONDS = os.getenv('QUOTA_USER_SECONDS')
+QUOTA_USER_BYTES = os.getenv('QUOTA_USER_BYTES')
+QUOTA_CHAT_SECONDS = os.getenv('QUOTA_CHAT_SECONDS')
+QUOTA_CHAT_BYTES = os.getenv('QUOTA_CHAT_BYTES')
+QUOTA_FILENAME = os.getenv('QUOTA_FILENAME')
+
 # Define the maximum character limit for a single message
 MAX_MESSAGE_LENGTH = os.getenv('MAX_MESSAGE_LENGTH')
 
+# Transcription results cache
+RESULT_CACHE_SIZE = os.getenv('RESULT_CACHE_SIZE')
+RESULT_CACHE_TTL = os.getenv('RESULT_CACHE_TTL')
+RESULT_CACHE_FILENAME = os.getenv('RESULT_CACHE_FILENAME')
+RESULT_CACHE_MAX_ENTRIES = os.getenv('RESULT_CACHE_MAX_ENTRIES')
+
+# Persistent API jobs queue
+JOB_STORE_FILENAME = os.getenv('JOB_STORE_FILENAME')
+JOB_STORE_COMMIT_INTERVAL = os.getenv('JOB_STORE_COMMIT_INTERVAL')
+
+# Split mode: bot process only receives updates, worker processes take jobs from job store
+SPLIT_PROCESSES = bool(os.getenv('SPLIT_PROCESSES')) and bool(JOB_STORE_FILENAME)
+WORKER_PROCESSES = os.getenv('WORKER_PROCESSES')
+BROKER_POLL_INTERVAL = os.getenv('BROKER_POLL_INTERVAL')
+
 SUPPORTED_FILE_EXTENSIONS = ('mid', 'mp3', 'opus', 'oga', 'ogg', 'wav', 'webm', 'weba', 'flac',
                         'wma', 'aiff', 'opus', 'm4a', 'au', 'mp4', 'avi', 'mkv', 'mov')
 
+VIDEO_FILE_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov')
+
+# API endpoints, tokens and concurrency caps are comma separated lists
+API_URL_TRANSCRIBE = [x.strip() for x in API_URL_TRANSCRIBE.split(",") if x.strip()] if API_URL_TRANSCRIBE else []
+API_URL_DIARIZE = [x.strip() for x in API_URL_DIARIZE.split(",") if x.strip()] if API_URL_DIARIZE else []
+HF_TOKEN_TRANSCRIBE = [x.strip() for x in HF_TOKEN_TRANSCRIBE.split(",")] if HF_TOKEN_TRANSCRIBE else []
+HF_TOKEN_DIARIZE = [x.strip() for x in HF_TOKEN_DIARIZE.split(",")] if HF_TOKEN_DIARIZE else []
+API_CONCURRENCY_TRANSCRIBE = [int(x) for x in API_CONCURRENCY_TRANSCRIBE.split(",")] if API_CONCURRENCY_TRANSCRIBE else []
+API_CONCURRENCY_DIARIZE = [int(x) for x in API_CONCURRENCY_DIARIZE.split(",")] if API_CONCURRENCY_DIARIZE else []
+API_LEND_TRANSCRIBE = [bool(int(x)) for x in API_LEND_TRANSCRIBE.split(",")] if API_LEND_TRANSCRIBE else []
+API_LEND_DIARIZE = [bool(int(x)) for x in API_LEND_DIARIZE.split(",")] if API_LEND_DIARIZE else []
+
+if API_HEALTH_CHECK_INTERVAL:
+    API_HEALTH_CHECK_INTERVAL = int(API_HEALTH_CHECK_INTERVAL)
+else:
+    API_HEALTH_CHECK_INTERVAL = 60
+
+if API_HEALTH_CHECK_TIMEOUT:
+    API_HEALTH_CHECK_TIMEOUT = int(API_HEALTH_CHECK_TIMEOUT)
+else:
+    API_HEALTH_CHECK_TIMEOUT = 10
+
+if API_RECONNECT_INTERVAL:
+    API_RECONNECT_INTERVAL = int(API_RECONNECT_INTERVAL)
+else:
+    API_RECONNECT_INTERVAL = 10
+
+if API_CONNECT_WAIT:
+    API_CONNECT_WAIT = int(API_CONNECT_WAIT)
+else:
+    API_CONNECT_WAIT = 120
+
+if API_REQUEST_TIMEOUT:
+    API_REQUEST_TIMEOUT = int(API_REQUEST_TIMEOUT)
+else:
+    API_REQUEST_TIMEOUT = None
+
+if API_RETRIES:
+    API_RETRIES = int(API_RETRIES)
+else:
+    API_RETRIES = 3
+
+if API_RETRY_BASE_DELAY:
+    API_RETRY_BASE_DELAY = float(API_RETRY_BASE_DELAY)
+else:
+    API_RETRY_BASE_DELAY = 1.0
+
+if API_RETRY_MAX_DELAY:
+    API_RETRY_MAX_DELAY = float(API_RETRY_MAX_DELAY)
+else:
+    API_RETRY_MAX_DELAY = 30.0
+
+if API_HEDGE_PERCENTILE:
+    API_HEDGE_PERCENTILE = float(API_HEDGE_PERCENTILE)
+
+if CIRCUIT_BREAKER_THRESHOLD:
+    CIRCUIT_BREAKER_THRESHOLD = int(CIRCUIT_BREAKER_THRESHOLD)
+else:
+    CIRCUIT_BREAKER_THRESHOLD = 5
+
+if CIRCUIT_BREAKER_TIMEOUT:
+    CIRCUIT_BREAKER_TIMEOUT = int(CIRCUIT_BREAKER_TIMEOUT)
+else:
+    CIRCUIT_BREAKER_TIMEOUT = 30
+
+if API_EXECUTOR_WORKERS:
+    API_EXECUTOR_WORKERS = int(API_EXECUTOR_WORKERS)
+
+if LOCAL_ENGINE_WORKERS:
+    LOCAL_ENGINE_WORKERS = int(LOCAL_ENGINE_WORKERS)
+
+if LOCAL_ENGINE_MODES:
+    LOCAL_ENGINE_MODES = [x.strip().lower() for x in LOCAL_ENGINE_MODES.split(",")]
+else:
+    LOCAL_ENGINE_MODES = ["transcribe"]
+
+if not LOCAL_ENGINE_MODEL_SIZE:
+    LOCAL_ENGINE_MODEL_SIZE = "base"
+
+if not LOCAL_ENGINE_COMPUTE_TYPE:
+    LOCAL_ENGINE_COMPUTE_TYPE = "int8"
+
 if MAX_FILE_SIZE:
     MAX_FILE_SIZE = float(MAX_FILE_SIZE) * 1024 * 1024
 
 if MAX_DURATION_SECONDS:
     MAX_DURATION_SECONDS = int(MAX_DURATION_SECONDS)
 
+if CHUNK_SECONDS:
+    CHUNK_SECONDS = float(CHUNK_SECONDS)
+
+if CHUNK_MIN_SECONDS:
+    CHUNK_MIN_SECONDS = float(CHUNK_MIN_SECONDS)
+else:
+    CHUNK_MIN_SECONDS = (CHUNK_SECONDS or 0) * 1.5
+
+if CHUNK_OVERLAP_SECONDS:
+    CHUNK_OVERLAP_SECONDS = float(CHUNK_OVERLAP_SECONDS)
+else:
+    CHUNK_OVERLAP_SECONDS = 1.0
+
+if PROGRESSIVE_EDIT_INTERVAL:
+    PROGRESSIVE_EDIT_INTERVAL = float(PROGRESSIVE_EDIT_INTERVAL)
+
+if BATCH_MAX_JOBS:
+    BATCH_MAX_JOBS = int(BATCH_MAX_JOBS)
+
+if BATCH_MAX_SECONDS:
+    BATCH_MAX_SECONDS = float(BATCH_MAX_SECONDS)
+else:
+    BATCH_MAX_SECONDS = 20.0
+
+if BATCH_WAIT:
+    BATCH_WAIT = float(BATCH_WAIT)
+else:
+    BATCH_WAIT = 0.3
+
+if BATCH_SEPARATOR_SECONDS:
+    BATCH_SEPARATOR_SECONDS = float(BATCH_SEPARATOR_SECONDS)
+else:
+    BATCH_SEPARATOR_SECONDS = 2.0
+
+if TRANSCODE_WORKERS:
+    TRANSCODE_WORKERS = int(TRANSCODE_WORKERS)
+else:
+    TRANSCODE_WORKERS = os.cpu_count() or 1
+
+if TRANSCODE_SAMPLE_RATE:
+    TRANSCODE_SAMPLE_RATE = int(TRANSCODE_SAMPLE_RATE)
+else:
+    TRANSCODE_SAMPLE_RATE = 16000
+
+if TRANSCODE_BITRATE is None:
+    TRANSCODE_BITRATE = "24k"
+
+if not CHUNK_SILENCE_THRESHOLD:
+    CHUNK_SILENCE_THRESHOLD = "-35dB"
+
+if CHUNK_SILENCE_DURATION:
+    CHUNK_SILENCE_DURATION = float(CHUNK_SILENCE_DURATION)
+else:
+    CHUNK_SILENCE_DURATION = 0.4
+
 if MAX_SIMULTANIOUS_REQUESTS:
     MAX_SIMULTANIOUS_REQUESTS = int(MAX_SIMULTANIOUS_REQUESTS)
 
+if ADMISSION_MAX_WAIT:
+    ADMISSION_MAX_WAIT = float(ADMISSION_MAX_WAIT)
+
+if ADMISSION_MAX_BYTES:
+    ADMISSION_MAX_BYTES = int(ADMISSION_MAX_BYTES)
+
+if ADMISSION_DEFER:
+    ADMISSION_DEFER = float(ADMISSION_DEFER)
+else:
+    ADMISSION_DEFER = 0
+
+SCHEDULER = SCHEDULER.lower() if SCHEDULER else "fifo"
+
+if SCHEDULER_AGING:
+    SCHEDULER_AGING = float(SCHEDULER_AGING)
+else:
+    SCHEDULER_AGING = 1.0
+
+if SCHEDULER_BYTES_PER_SECOND:
+    SCHEDULER_BYTES_PER_SECOND = int(SCHEDULER_BYTES_PER_SECOND)
+else:
+    SCHEDULER_BYTES_PER_SECOND = 16000
+
+FAIR_QUEUE_KEY = FAIR_QUEUE_KEY.lower() if FAIR_QUEUE_KEY else "user"
+
+# Non-positive quantum never lets deficit reach job cost, default is used instead
+if FAIR_QUEUE_QUANTUM and float(FAIR_QUEUE_QUANTUM) > 0:
+    FAIR_QUEUE_QUANTUM = float(FAIR_QUEUE_QUANTUM)
+else:
+    FAIR_QUEUE_QUANTUM = 30.0
+
+if QUEUE_STATUS_INTERVAL:
+    QUEUE_STATUS_INTERVAL = int(QUEUE_STATUS_INTERVAL)
+
+if QUEUE_STATUS_MAX_EDITS:
+    QUEUE_STATUS_MAX_EDITS = int(QUEUE_STATUS_MAX_EDITS)
+else:
+    QUEUE_STATUS_MAX_EDITS = 20
+
+if SERVICE_TIME_SMOOTHING:
+    SERVICE_TIME_SMOOTHING = float(SERVICE_TIME_SMOOTHING)
+else:
+    SERVICE_TIME_SMOOTHING = 0.2
+
+if TRANSCRIBE_WORKERS:
+    TRANSCRIBE_WORKERS = int(TRANSCRIBE_WORKERS)
+
+if DIARIZE_WORKERS:
+    DIARIZE_WORKERS = int(DIARIZE_WORKERS)
+
 if USER_RATE_LIMIT:
     USER_RATE_LIMIT = int(USER_RATE_LIMIT)
 
 if USER_REQUEST_TIME:
     USER_REQUEST_TIME = int(USER_REQUEST_TIME)
 
+QUOTA_WINDOWS = [int(x) for x in QUOTA_WINDOWS.split(",")] if QUOTA_WINDOWS else [3600, 86400]
+
+# Quota for each window, empty value - unlimited
+QUOTA_USER_SECONDS = [float(x) if x.strip() else None for x in QUOTA_USER_SECONDS.split(",")] if QUOTA_USER_SECONDS else []
+QUOTA_USER_BYTES = [int(x) if x.strip() else None for x in QUOTA_USER_BYTES.split(",")] if QUOTA_USER_BYTES else []
+QUOTA_CHAT_SECONDS = [float(x) if x.strip() else None for x in QUOTA_CHAT_SECONDS.split(",")] if QUOTA_CHAT_SECONDS else []
+QUOTA_CHAT_BYTES = [int(x) if x.strip() else None for x in QUOTA_CHAT_BYTES.split(",")] if QUOTA_CHAT_BYTES else []
+
 if ADMIN_ID:
     ADMIN_ID = [int(x) for x in ADMIN_ID.split(",")]
 
+if WEBHOOK_PORT:
+    WEBHOOK_PORT = int(WEBHOOK_PORT)
+else:
+    WEBHOOK_PORT = 8080
+
 if MAX_MESSAGE_LENGTH:
     MAX_MESSAGE_LENGTH = int(MAX_MESSAGE_LENGTH)
 else:
     MAX_MESSAGE_LENGTH = 4096
 
+if RESULT_CACHE_SIZE:
+    RESULT_CACHE_SIZE = int(RESULT_CACHE_SIZE)
+
+if RESULT_CACHE_TTL:
+    RESULT_CACHE_TTL = int(RESULT_CACHE_TTL)
+
+if RESULT_CACHE_MAX_ENTRIES:
+    RESULT_CACHE_MAX_ENTRIES = int(RESULT_CACHE_MAX_ENTRIES)
+
+if JOB_STORE_COMMIT_INTERVAL:
+    JOB_STORE_COMMIT_INTERVAL = float(JOB_STORE_COMMIT_INTERVAL)
+else:
+    JOB_STORE_COMMIT_INTERVAL = 0.1
+
+if WORKER_PROCESSES:
+    WORKER_PROCESSES = int(WORKER_PROCESSES)
+else:
+    WORKER_PROCESSES = os.cpu_count() or 1
+
+if BROKER_POLL_INTERVAL:
+    BROKER_POLL_INTERVAL = float(BROKER_POLL_INTERVAL)
+else:
+    BROKER_POLL_INTERVAL = 0.2
+
 # Set log format
 if not LOG_FORMAT:
     LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
@@ -0,0 +1,67 @@
+import time
+import asyncio
+from aiogram import types
+
+from messages.telegram.api import TG_API_NO_TEXT, TG_PARTIAL_RESULT_SUFFIX
+from utils import edit_message, reply_message, delete_message
+from config import MAX_MESSAGE_LENGTH, PROGRESSIVE_EDIT_INTERVAL
+
+
+# Reply that shows partial result while it is growing, rolls over to new messages when too long
+class ProgressiveMessage:
+    def __init__(self, msg: types.Message):
+        self.messages = [msg]
+        self.parts = [None]
+        self.last_update = 0
+        self.lock = asyncio.Lock()
+
+    # Function to split text into message parts, room for suffix is kept so parts don't shift
+    @staticmethod
+    def split(text: str, suffix: str):
+        limit = MAX_MESSAGE_LENGTH - len(TG_PARTIAL_RESULT_SUFFIX)
+        parts = [text[i:i + limit] for i in range(0, len(text), limit)] or [""]
+        parts[-1] += suffix
+        return parts
+
+    # Function to show text, edits only changed parts and replies with new ones
+    async def show(self, text: str, suffix: str):
+        for i, part in enumerate(self.split(text, suffix)):
+            if i < len(self.messages):
+                if self.parts[i] == part:
+                    continue
+
+                msg = await edit_message(self.messages[i], part, send_new=False)
+                if msg:
+                    self.messages[i] = msg
+                    self.parts[i] = part
+            else:
+                msg = await reply_message(self.messages[-1], part)
+                if not msg:
+                    return
+
+                self.messages.append(msg)
+                self.parts.append(part)
+
+    # Function to show partial result, throttled to save Telegram rate limits
+    async def update(self, text: str):
+        async with self.lock:
+            if not text or time.monotonic() - self.last_update < PROGRESSIVE_EDIT_INTERVAL:
+                return
+
+            self.last_update = time.monotonic()
+            await self.show(text, TG_PARTIAL_RESULT_SUFFIX)
+
+    # Function to show final result
+    async def finish(self, text: str):
+        async with self.lock:
+            await self.show(text or TG_API_NO_TEXT, "")
+
+    # Function to replace partial result with error, rolled over messages are removed
+    async def fail(self, text: str):
+        async with self.lock:
+            await edit_message(self.messages[0], text)
+            for msg in self.messages[1:]:
+                await delete_message(msg)
+
+            self.messages = self.messages[:1]
+            self.parts = [text]
@@ -0,0 +1,69 @@
+import os
+import json
+import aiohttp
+
+from config import API_REQUEST_TIMEOUT, API_HEALTH_CHECK_TIMEOUT
+
+
+# Error returned by Gradio space in event stream
+class GradioError(Exception):
+    pass
+
+
+# Async client for Gradio HTTP API (Gradio 4+): upload file, POST /call/<api> and read result from SSE stream
+# Uses one pooled session per space, requests can be cancelled
+class AsyncGradioClient:
+    def __init__(self, src: str, hf_token: str = None, max_connections: int = 10):
+        self.src = src.rstrip("/") + "/"
+        self.headers = {"Authorization": f"Bearer {hf_token}"} if hf_token else {}
+        self.max_connections = max_connections
+        self.session = None
+
+    # Get session, created on first request inside running loop
+    def get_session(self):
+        if not self.session or self.session.closed:
+            timeout = aiohttp.ClientTimeout(total=API_REQUEST_TIMEOUT, sock_connect=API_HEALTH_CHECK_TIMEOUT)
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self.session = aiohttp.ClientSession(headers=self.headers, timeout=timeout, connector=connector)
+
+        return self.session
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    # Function to upload file to space, returns file data for API call
+    async def upload(self, file_path: str):
+        form = aiohttp.FormData()
+        with open(file_path, "rb") as file:
+            form.add_field("files", file, filename=os.path.basename(file_path))
+            async with self.get_session().post(self.src + "upload", data=form) as response:
+                response.raise_for_status()
+                paths = await response.json()
+
+        return {"path": paths[0], "meta": {"_type": "gradio.FileData"}}
+
+    # Function to call space API, returns list of outputs
+    async def predict(self, api_name: str, *data):
+        url = self.src + "call/" + api_name.strip("/")
+        session = self.get_session()
+        async with session.post(url, json={"data": list(data)}) as response:
+            response.raise_for_status()
+            event_id = (await response.json())["event_id"]
+
+        async with session.get(f"{url}/{event_id}") as response:
+            response.raise_for_status()
+            event = None
+            async for line in response.content:
+                line = line.decode("utf-8").strip()
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:") and event in ("complete", "error"):
+                    payload = line[len("data:"):].strip()
+                    if event == "error":
+                        raise GradioError(payload)
+
+                    return json.loads(payload)
+
+        raise GradioError("event stream closed without result")
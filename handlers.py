@@ -11,6 +11,7 @@ from messages.log.other import INVALID_MESSAGE
 from messages.telegram.handlers import *
 from messages.telegram.other import TG_INVALID_MESSAGE_DIRECT
 from api import process_request
+from quotas import USER_SCOPE, CHAT_SCOPE, get_quota_usage, set_quota_override, format_window
 from utils import get_bot_settings, check_if_admin, get_args_after_command, get_last_n_lines,\
                     send_long_message, send_message_to_admins, forward_message_to_admins,\
                     logs_formatter, reply_message
@@ -400,6 +401,95 @@ async def get_chat_id(message: types.Message):
             await reply_message(message, TG_ENABLE_WHEN_ENABLED)
 
 
+# Function to parse quota command target: (scope, id, other arguments), None if invalid
+def parse_quota_target(args: str):
+    parts = args.split() if args else []
+    if len(parts) < 2 or parts[0] not in (USER_SCOPE, CHAT_SCOPE):
+        return None
+
+    try:
+        return parts[0], int(parts[1]), parts[2:]
+    except ValueError:
+        return None
+
+
+# Function to parse quota values for each window separated by comma, empty value - unlimited
+def parse_quota_limits(text: str, value_type):
+    return [value_type(x) if x.strip() else None for x in text.split(",")]
+
+
+# Function to format quota usage of user or chat
+def format_quota_usage(scope: str, scope_id: int):
+    lines = []
+    for window, used_seconds, seconds_limit, used_bytes, bytes_limit in get_quota_usage(scope, scope_id):
+        lines.append(TG_QUOTA_WINDOW.format(format_window(window), int(used_seconds),
+                                            TG_QUOTA_UNLIMITED if seconds_limit is None else int(seconds_limit),
+                                            used_bytes, TG_QUOTA_UNLIMITED if bytes_limit is None else bytes_limit))
+
+    return "\n".join(lines)
+
+
+# Function to handle quota commands
+@dp.message(Command("quota"))
+async def get_quota(message: types.Message):
+    chat_id = message.chat.id
+    user = message.from_user
+    user_id = user.id
+
+    if not check_if_admin(chat_id, user_id):
+        logger.info(QUOTA_NOT_ADMIN.format(user_id, chat_id, user.username))
+        return
+
+    args = get_args_after_command(message.text, "quota")
+    target = parse_quota_target(args)
+    if not target or target[2]:
+        logger.info(QUOTA_INVALID_ARGS.format(user_id, chat_id, user.username, args))
+        await reply_message(message, TG_QUOTA_INVALID_FORMAT)
+        return
+
+    scope, scope_id, _ = target
+    logger.info(QUOTA_INFO.format(user_id, chat_id, user.username, scope, scope_id))
+    await reply_message(message, TG_QUOTA_INFO.format(scope, scope_id, format_quota_usage(scope, scope_id)),
+                        parse_mode="HTML")
+
+
+# Function to handle setquota commands
+# /setquota user|chat id seconds [bytes], unlimited - remove limits, default - remove override
+@dp.message(Command("setquota"))
+async def set_quota(message: types.Message):
+    chat_id = message.chat.id
+    user = message.from_user
+    user_id = user.id
+
+    if not check_if_admin(chat_id, user_id):
+        logger.info(SET_QUOTA_NOT_ADMIN.format(user_id, chat_id, user.username))
+        return
+
+    args = get_args_after_command(message.text, "setquota")
+    target = parse_quota_target(args)
+    limits = None
+    try:
+        if not target or not 1 <= len(target[2]) <= 2:
+            raise ValueError("invalid format")
+
+        values = target[2]
+        if values[0] == "unlimited" and len(values) == 1:
+            limits = ([], [])
+        elif values[0] != "default" or len(values) > 1:
+            limits = (parse_quota_limits(values[0], float),
+                      parse_quota_limits(values[1], int) if len(values) > 1 else [])
+    except ValueError:
+        logger.info(SET_QUOTA_INVALID_ARGS.format(user_id, chat_id, user.username, args))
+        await reply_message(message, TG_SET_QUOTA_INVALID_FORMAT)
+        return
+
+    scope, scope_id, _ = target
+    await set_quota_override(scope, scope_id, limits)
+    logger.info(SET_QUOTA_SUCCESS.format(user_id, chat_id, user.username, scope, scope_id, " ".join(target[2])))
+    await reply_message(message, TG_SET_QUOTA_SUCCESS.format(scope, scope_id, format_quota_usage(scope, scope_id)),
+                        parse_mode="HTML")
+
+
 # Function to handle all messages
 @dp.message()
 async def all_messages(message: types.Message):
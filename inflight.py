@@ -0,0 +1,37 @@
+import asyncio
+
+
+# Requests being processed now: (file_unique_id, diarize) -> future with result
+# Duplicates of the same file wait for the running request instead of calling API again
+inflight_requests = {}
+
+
+# Function to get future of the running request for the file, None if there is no such request
+def get_inflight_request(file_unique_id: str, diarize: bool):
+    return inflight_requests.get((file_unique_id, diarize))
+
+
+# Function to register request for the file, returns future to resolve when it is done
+def start_inflight_request(file_unique_id: str, diarize: bool):
+    future = asyncio.get_running_loop().create_future()
+    inflight_requests[(file_unique_id, diarize)] = future
+    return future
+
+
+# Function to finish request and pass result (or error) to waiting duplicates
+# None result means request was not processed, duplicates have to process the file themselves
+def finish_inflight_request(file_unique_id: str, diarize: bool, future: asyncio.Future, result=None,
+                            error: Exception = None):
+    key = (file_unique_id, diarize)
+    if inflight_requests.get(key) is future:
+        del inflight_requests[key]
+
+    if future.done():
+        return
+
+    if error is not None:
+        future.set_exception(error)
+        # Mark exception as retrieved if nobody waits for it
+        future.exception()
+    else:
+        future.set_result(result)
@@ -0,0 +1,222 @@
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from datetime import datetime
+from aiogram import types
+
+from bot_init import bot
+from logger import logger
+from jobs import Job
+from messages.log.job_store import JOB_STORE_OPEN_ERROR, JOB_STORE_READ_ERROR, JOB_STORE_WRITE_ERROR
+from utils import to_thread
+from config import JOB_STORE_FILENAME, JOB_STORE_COMMIT_INTERVAL
+
+
+# Persistent queue of API jobs, jobs are resumed after restart
+db_lock = threading.Lock()
+db_connection = None
+
+# Writes waiting for the next batched commit: (sql, params)
+pending_writes = []
+
+
+if JOB_STORE_FILENAME:
+    try:
+        db_connection = sqlite3.connect(JOB_STORE_FILENAME, check_same_thread=False)
+        db_connection.execute("PRAGMA journal_mode=WAL")
+        db_connection.execute("PRAGMA synchronous=NORMAL")
+        db_connection.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                              "id TEXT PRIMARY KEY, data TEXT NOT NULL, created REAL NOT NULL, "
+                              "diarize INTEGER NOT NULL DEFAULT 0, file_unique_id TEXT, claimed_by TEXT)")
+        db_connection.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (claimed_by, diarize, created)")
+        db_connection.commit()
+    except Exception as e:
+        db_connection = None
+        logger.error(JOB_STORE_OPEN_ERROR.format(str(e)))
+
+
+# Check if jobs are persisted
+def is_job_store_enabled():
+    return db_connection is not None
+
+
+# Function to convert job to JSON, reply message is kept as chat and message ids
+def dump_job(job: Job):
+    return json.dumps({
+        "audio_path": job.audio_path,
+        "file_id": job.file_id,
+        "file_unique_id": job.file_unique_id,
+        "chat_id": job.chat_id,
+        "chat_type": job.msg.chat.type,
+        "message_id": job.msg.message_id,
+        "user_id": job.user_id,
+        "username": job.username,
+        "diarize": job.diarize,
+        "duration": job.duration,
+        "file_size": job.file_size,
+        "is_video": job.is_video,
+        "status_text": job.status_text,
+    })
+
+
+# Function to restore job from JSON, waiting time before restart is kept for schedulers
+def load_job(job_id: str, data: str, created: float, claimed_by: str = None):
+    data = json.loads(data)
+    chat = types.Chat(id=data["chat_id"], type=data["chat_type"])
+    msg = types.Message(message_id=data["message_id"], date=datetime.now(), chat=chat).as_(bot)
+
+    job = Job(data["audio_path"], data["file_id"], data["file_unique_id"], msg, data["user_id"], data["username"],
+              data["chat_id"], data["diarize"], data["duration"], data["file_size"], data["is_video"])
+    job.id = job_id
+    job.claimed_by = claimed_by
+    job.created = time.monotonic() - max(time.time() - created, 0)
+    job.status_text = data["status_text"]
+    return job
+
+
+# Function to apply writes in one transaction (blocking)
+def db_write(writes: list):
+    with db_lock:
+        with db_connection:
+            for sql, params in writes:
+                db_connection.execute(sql, params)
+
+
+# Function to read all stored jobs in order of creation (blocking)
+def db_read():
+    with db_lock:
+        return db_connection.execute("SELECT id, data, created FROM jobs ORDER BY created").fetchall()
+
+
+# Function to claim the oldest unclaimed job with all its duplicates for worker process (blocking)
+# Immediate transaction locks database for writing, so each job is claimed by one worker
+def db_claim(worker_id: str, diarize: bool):
+    with db_lock:
+        with db_connection:
+            db_connection.execute("BEGIN IMMEDIATE")
+            row = db_connection.execute("SELECT file_unique_id FROM jobs WHERE claimed_by IS NULL AND diarize = ? "
+                                        "ORDER BY created LIMIT 1", (diarize,)).fetchone()
+            if not row:
+                return []
+
+            rows = db_connection.execute("SELECT id, data, created FROM jobs WHERE claimed_by IS NULL "
+                                         "AND diarize = ? AND file_unique_id = ? ORDER BY created",
+                                         (diarize, row[0])).fetchall()
+            db_connection.executemany("UPDATE jobs SET claimed_by = ? WHERE id = ?",
+                                      [(worker_id, job_id) for job_id, _, _ in rows])
+
+    return rows
+
+
+# Function to return jobs claimed by worker to the queue (blocking)
+def db_release(worker_id: str):
+    with db_lock:
+        with db_connection:
+            db_connection.execute("UPDATE jobs SET claimed_by = NULL WHERE claimed_by = ?", (worker_id,))
+
+
+# Function to count unclaimed jobs (blocking)
+def db_count(diarize: bool):
+    with db_lock:
+        return db_connection.execute("SELECT COUNT(*) FROM jobs WHERE claimed_by IS NULL AND diarize = ?",
+                                     (diarize,)).fetchone()[0]
+
+
+# Function to add job to the store, written on the next batched commit
+def store_job(job: Job):
+    if not db_connection or not job.msg:
+        return
+
+    if not job.id:
+        job.id = uuid.uuid4().hex
+
+    pending_writes.append(("INSERT OR REPLACE INTO jobs (id, data, created, diarize, file_unique_id, claimed_by) "
+                           "VALUES (?, ?, ?, ?, ?, ?)",
+                           (job.id, dump_job(job), time.time() - (time.monotonic() - job.created), job.diarize,
+                            job.file_unique_id, job.claimed_by)))
+
+
+# Function to remove finished job from the store
+def remove_stored_job(job: Job):
+    if not db_connection or not job.id:
+        return
+
+    pending_writes.append(("DELETE FROM jobs WHERE id = ?", (job.id,)))
+
+
+# Function to commit pending writes
+async def flush_job_store():
+    global pending_writes
+    if not pending_writes:
+        return
+
+    writes, pending_writes = pending_writes, []
+    try:
+        await to_thread(db_write, writes)
+    except Exception as e:
+        logger.error(JOB_STORE_WRITE_ERROR.format(str(e)))
+
+
+# Function to commit writes in batches, so enqueue does not wait for disk
+async def job_store_loop():
+    while True:
+        await asyncio.sleep(JOB_STORE_COMMIT_INTERVAL)
+        await flush_job_store()
+
+
+# Function to get jobs left after previous run
+async def load_stored_jobs():
+    if not db_connection:
+        return []
+
+    try:
+        rows = await to_thread(db_read)
+    except Exception as e:
+        logger.error(JOB_STORE_READ_ERROR.format(str(e)))
+        return []
+
+    return parse_jobs(rows)
+
+
+# Function to restore jobs from database rows, broken jobs are removed
+def parse_jobs(rows: list, claimed_by: str = None):
+    jobs = []
+    for job_id, data, created in rows:
+        try:
+            jobs.append(load_job(job_id, data, created, claimed_by))
+        except Exception as e:
+            logger.error(JOB_STORE_READ_ERROR.format(str(e)))
+            pending_writes.append(("DELETE FROM jobs WHERE id = ?", (job_id,)))
+
+    return jobs
+
+
+# Function to claim the oldest job and its duplicates for worker process, first job is the oldest
+async def claim_stored_jobs(worker_id: str, diarize: bool):
+    try:
+        rows = await to_thread(db_claim, worker_id, diarize)
+    except Exception as e:
+        logger.error(JOB_STORE_READ_ERROR.format(str(e)))
+        return []
+
+    return parse_jobs(rows, worker_id)
+
+
+# Function to return jobs of stopped worker process to the queue
+async def release_claimed_jobs(worker_id: str):
+    try:
+        await to_thread(db_release, worker_id)
+    except Exception as e:
+        logger.error(JOB_STORE_WRITE_ERROR.format(str(e)))
+
+
+# Function to get number of jobs waiting for worker processes
+async def count_stored_jobs(diarize: bool):
+    try:
+        return await to_thread(db_count, diarize)
+    except Exception as e:
+        logger.error(JOB_STORE_READ_ERROR.format(str(e)))
+        return 0
@@ -0,0 +1,55 @@
+import time
+import asyncio
+from aiogram import types
+
+from config import SCHEDULER_BYTES_PER_SECOND
+
+
+# API request waiting in the queue
+class Job:
+    def __init__(self, audio_path: str, file_id: str, file_unique_id: str, msg: types.Message,
+                    user_id: int, username: str, chat_id: int, diarize: bool,
+                    duration: int = None, file_size: int = None, is_video: bool = False):
+        self.audio_path = audio_path
+        self.file_id = file_id
+        self.file_unique_id = file_unique_id
+        self.msg = msg
+        self.user_id = user_id
+        self.username = username
+        self.chat_id = chat_id
+        self.diarize = diarize
+        self.duration = duration
+        self.file_size = file_size
+        self.is_video = is_video
+        self.created = time.monotonic()
+
+        # Id in persistent job store and worker process that claimed the job
+        self.id = None
+        self.claimed_by = None
+
+        # Serializes status edits of the reply message between queue and worker
+        self.msg_lock = asyncio.Lock()
+        self.started = False
+        self.status_text = None
+
+        # Future with the result for duplicate requests of the same file
+        self.inflight = None
+
+        # Place in API backlog, released when job is finished
+        self.admission = None
+
+    # Estimated audio seconds, from Telegram duration or file size
+    @property
+    def cost(self):
+        return estimate_audio_seconds(self.duration, self.file_size)
+
+
+# Function to estimate audio seconds of file from Telegram duration or file size
+def estimate_audio_seconds(duration: int = None, file_size: int = None):
+    if duration:
+        return duration
+
+    if file_size:
+        return file_size / SCHEDULER_BYTES_PER_SECOND
+
+    return 0
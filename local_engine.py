@@ -0,0 +1,42 @@
+import importlib
+
+from config import LOCAL_ENGINE_MODEL_SIZE, LOCAL_ENGINE_COMPUTE_TYPE
+
+
+# Speech model loaded once in each worker process
+model = None
+
+
+# Function to load model in worker process, used as process pool initializer
+# model_spec is "module:factory", factory returns object with transcribe(path) and optional diarize(path)
+def load_model(model_spec: str):
+    global model
+    module_name, _, factory_name = model_spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), factory_name)
+    model = factory()
+
+
+# Function to check if worker process is ready
+def ping():
+    return model is not None
+
+
+# Function to transcribe audio file in worker process
+def transcribe(audio_path: str):
+    return model.transcribe(audio_path)
+
+
+# Function to diarize audio file in worker process
+def diarize(audio_path: str):
+    return model.diarize(audio_path)
+
+
+# CPU Whisper model, requires optional faster-whisper package
+class FasterWhisperModel:
+    def __init__(self):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(LOCAL_ENGINE_MODEL_SIZE, device="cpu", compute_type=LOCAL_ENGINE_COMPUTE_TYPE)
+
+    def transcribe(self, audio_path: str):
+        segments, _ = self.model.transcribe(audio_path)
+        return [{"start": segment.start, "end": segment.end, "text": segment.text} for segment in segments]
@@ -1,7 +1,5 @@
 from messages.log.default import USER_COMMAND, U_PREFIX
 
-API_TRANSSCRIBE_CONNECT_ERROR = USER_COMMAND + "API Transcribe Connect error: {}"
-API_DIARIZE_CONNECT_ERROR = USER_COMMAND + "API Diarize Connect error: {}"
 API_URL_TRANSCRIBE_NOT_SET = USER_COMMAND + "API_URL_TRANSCRIBE not set! Bot can't transcribe audio!"
 API_URL_DIARIZE_NOT_SET = USER_COMMAND + "API_URL_DIARIZE not set! Bot can't diarize audio!"
 
@@ -9,7 +7,10 @@ API_TRANSCRIBE_NOT_CONNECTED = U_PREFIX + "Transcribe API is not connected!"
 API_DIARIZE_NOT_CONNECTED = U_PREFIX + "Diarize API is not connected!"
 
 REQUEST_LIMIT_REACHED = U_PREFIX + "Reached max request limit!"
+QUOTA_EXCEEDED = U_PREFIX + "File: {}, Rejected, {} quota for {} seconds window is used up"
+BACKLOG_FULL = U_PREFIX + "File: {}, Rejected, API backlog: {:.0f} audio seconds, {} bytes"
 PROCESSING_ERROR = U_PREFIX + "Processing error: {}"
+INFLIGHT_JOINED = U_PREFIX + "File: {}, Waiting for result of the same file requested by another message"
 
 TRANSCRIBE_RESULT = U_PREFIX + "File: {}, Result: {}"
 TRANSCRIBE_ERROR = U_PREFIX + "File: {}, Transcribe API error: {}"
@@ -18,4 +19,10 @@ TRANSCRIBE_SENDING_ERROR = U_PREFIX + "File: {}, Error sending result: {}"
 DIARIZE_RESULT = U_PREFIX + "File: {}, Result: {}"
 DIARIZE_ERROR = U_PREFIX + "File: {}, Diarize API error: {}"
 DIARIZE_NO_SPEAKERS_ERROR = U_PREFIX + "File: {}, Diarize API no speakers detected error!"
+QUEUE_STATUS_ERROR = U_PREFIX + "Queue status update error: {}"
+
 DIARIZE_SENDING_ERROR = U_PREFIX + "File: {}, Error sending result: {}"
+
+WORKER_STARTED = "API queue worker {} started"
+WORKER_ERROR = "API queue worker {} error: {}"
+WORKERS_STOPPED = "API queue workers stopped"
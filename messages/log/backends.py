@@ -0,0 +1,8 @@
+BACKEND_CONNECT_ERROR = "API {} backend {} connect error: {}"
+BACKEND_PROBE_ERROR = "API {} backend {} health check error: {}"
+BACKEND_HEALTHY = "API {} backend {} is healthy"
+BACKEND_UNHEALTHY = "API {} backend {} is unhealthy, removed from rotation"
+BACKEND_CIRCUIT_OPEN = "API {} backend {} failed too many times, circuit opened for {} seconds"
+BACKEND_RETRY = "API {} request retry {}/{} in {:.1f} seconds after error: {}"
+BACKEND_HEDGE = "API {} backend {} is slow, sending duplicate request to {}"
+BACKEND_NO_SEGMENTS = "API {} backend {} returned result without timestamps, short files are not batched for it"
@@ -0,0 +1,2 @@
+BATCH_DONE = "Transcribed {} files in one request, batched files: {}/{} ({:.0%})"
+BATCH_ERROR = "Batch of {} files failed, sending them one by one: {}"
@@ -0,0 +1,4 @@
+WORKER_PROCESS_STARTED = "Worker process {} started"
+WORKER_PROCESS_STOPPED = "Worker process {} stopped"
+WORKER_PROCESSES_STARTED = "Started {} worker processes"
+WORKER_PROCESS_DIED = "Worker process {} died with exit code {}, restarting"
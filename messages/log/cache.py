@@ -0,0 +1,7 @@
+from messages.log.default import U_PREFIX
+
+CACHE_DB_OPEN_ERROR = "Can't open result cache database: {}"
+CACHE_DB_READ_ERROR = "Result cache read error: {}"
+CACHE_DB_WRITE_ERROR = "Result cache write error: {}"
+
+CACHE_HIT = U_PREFIX + "File: {}, Cached Result: {}"
@@ -0,0 +1,4 @@
+from messages.log.default import U_PREFIX
+
+CHUNKING_PLAN = U_PREFIX + "File: {}, Split into {} chunks"
+CHUNKING_ERROR = U_PREFIX + "File: {}, Can't split into chunks: {}"
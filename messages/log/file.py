@@ -9,3 +9,7 @@ UNKNOWN_EXTENSION = U_PREFIX + "File: {}, Unknown file extension"
 UNSUPPORTED_FORMAT = U_PREFIX + "File: {}, Unsupported file format: {}"
 DOWNLOAD_ERROR = U_PREFIX + "Error downloading: {}, {}"
 UNKNOWN_ERROR = U_PREFIX + "Error: {}"
+TRANSCODE_ERROR = U_PREFIX + "File: {}, Transcoding error: {}"
+EXTRACT_AUDIO_ERROR = U_PREFIX + "File: {}, Audio extraction error: {}"
+NO_AUDIO_STREAM = U_PREFIX + "File: {}, Video has no audio stream"
+SPOOL_REMOVE_ERROR = "Can't remove temp file: {}, {}"
@@ -51,3 +51,11 @@ DISABLE_SUCCESS = A_PREFIX + "Disabled successfully"
 ENABLE_NOT_ADMIN = A_PREFIX + "Tried to use enable command!"
 ENABLE_WHEN_ENABLED = A_PREFIX + "Bot is already enabled!"
 ENABLE_SUCCESS = A_PREFIX + "Enabled successfully"
+
+QUOTA_NOT_ADMIN = A_PREFIX + "Tried to use quota command!"
+QUOTA_INVALID_ARGS = A_PREFIX + "Invalid quota command arguments: {}"
+QUOTA_INFO = A_PREFIX + "Get quota of {} {}"
+
+SET_QUOTA_NOT_ADMIN = A_PREFIX + "Tried to use setquota command!"
+SET_QUOTA_INVALID_ARGS = A_PREFIX + "Invalid setquota command arguments: {}"
+SET_QUOTA_SUCCESS = A_PREFIX + "Set quota of {} {}: {}"
@@ -0,0 +1,8 @@
+from messages.log.default import U_PREFIX
+
+JOB_STORE_OPEN_ERROR = "Can't open job store database: {}"
+JOB_STORE_READ_ERROR = "Job store read error: {}"
+JOB_STORE_WRITE_ERROR = "Job store write error: {}"
+
+JOBS_RESUMED = "Resumed {} jobs from job store"
+JOB_RESUME_ERROR = U_PREFIX + "File: {}, Can't resume job: {}"
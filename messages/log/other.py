@@ -4,10 +4,13 @@ LOGGING_WITHOUT_FILE = "LOG_FILENAME not set! Logging to the file disabled!"
 TELEGRAM_TOKEN_NOT_SET = "TELEGRAM_BOT_TOKEN not set! App will crash soon..."
 APP_START = "App started!"
 APP_ERROR = "App Error: {}"
+WEBHOOK_STARTED = "Webhook server started on {}:{}, updates: {}"
+POLLING_STARTED = "Long polling started, updates: {}"
 
 EDIT_MESSAGE_ERROR = "Can't edit message: {}"
 SEND_MESSAGE_ERROR = "Can't send message: {}"
 REPLY_MESSAGE_ERROR = "Can't reply to message: {}"
+DELETE_MESSAGE_ERROR = "Can't delete message: {}"
 
 INVALID_MESSAGE = U_PREFIX + "Invalid message: {}"
 REQUEST_LIMIT = U_PREFIX + "Max request limit exceeded!"
@@ -0,0 +1,3 @@
+QUOTA_DB_OPEN_ERROR = "Can't open quotas database: {}"
+QUOTA_DB_READ_ERROR = "Quotas database read error: {}"
+QUOTA_DB_WRITE_ERROR = "Quotas database write error: {}"
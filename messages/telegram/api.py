@@ -1,4 +1,9 @@
 TG_REQUEST_LIMIT_REACHED = "Sorry, the maximum simultaneous request limit has been reached: {}. Please try again later."
+TG_BACKLOG_FULL = "Sorry, too many files are waiting for processing. Please try again later."
+TG_QUOTA_EXCEEDED = "Sorry, audio quota of this {} for {} is used up. Please try again later."
+TG_QUOTA_EXCEEDED_ETA = "Sorry, audio quota of this {} for {} is used up. Please try again in {}."
+TG_QUOTA_FILE_TOO_LONG = "Sorry, this file is larger than audio quota of this {} for {}."
+TG_BACKLOG_FULL_ETA = "Sorry, too many files are waiting for processing, estimated wait: {}. Please try again later."
 
 TG_WAIT_TRANSCRIBE = "Transcribing..."
 TG_WAIT_DIARIZE = "Diarizing..."
@@ -11,8 +16,10 @@ TG_API_DIARIZE_NO_SPEAKERS_ERROR = "No speakers detected! Please try transcribe
 TG_API_DIARIZE_SEND_ERROR = "Error sending result!"
 
 TG_API_NO_TEXT = "Text not recognized!"
+TG_PARTIAL_RESULT_SUFFIX = " ..."
 
 TG_API_TRANSCRIBE_NOT_CONNECTED = "Transcribe API is not connected!"
 TG_API_DIARIZE_NOT_CONNECTED = "Diarize API is not connected!"
 
-TG_API_QUEUED = "Queued! Please wait!"
+TG_API_QUEUED = "Queued! Position in queue: {}. Please wait!"
+TG_API_QUEUED_ETA = "Queued! Position in queue: {}. Estimated wait: {}. Please wait!"
@@ -31,3 +31,13 @@ TG_DISABLE_WHEN_DISABLED = "Bot is already disabled!"
 
 TG_ENABLE_SUCCESS = "Bot enabled!"
 TG_ENABLE_WHEN_ENABLED = "Bot is already enabled!"
+
+TG_QUOTA_INVALID_FORMAT = "Please provide user or chat id with the command in the format /quota user|chat id"
+TG_QUOTA_INFO = "Quota of {} <code>{}</code>:\n{}"
+TG_QUOTA_WINDOW = "{}: {} of {} audio seconds, {} of {} bytes"
+TG_QUOTA_UNLIMITED = "unlimited"
+
+TG_SET_QUOTA_INVALID_FORMAT = ("Please provide quota in the format /setquota user|chat id seconds [bytes], "
+                               "values for each window separated by comma, empty value - unlimited. "
+                               "Use unlimited or default instead of values to remove limits or override")
+TG_SET_QUOTA_SUCCESS = "Quota of {} <code>{}</code> is set!\n{}"
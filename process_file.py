@@ -1,3 +1,6 @@
+import os
+import asyncio
+import tempfile
 from aiogram import types
 
 from bot_init import bot
@@ -7,9 +10,52 @@ from messages.log.other import INVALID_MESSAGE
 from messages.telegram.file import *
 from messages.telegram.other import TG_INVALID_MESSAGE_REPLY
 from utils import reply_message, edit_message
-from config import MAX_FILE_SIZE, MAX_DURATION_SECONDS, SUPPORTED_FILE_EXTENSIONS
+from config import MAX_FILE_SIZE, MAX_DURATION_SECONDS, SUPPORTED_FILE_EXTENSIONS, VIDEO_FILE_EXTENSIONS, \
+                    SPOOL_DIR
 
 
+# Function to get file object from message
+def get_message_file(message: types.Message):
+    if not message:
+        return None
+
+    return message.voice or message.audio or message.video_note or message.video or message.document
+
+
+# Check if file from message is a video
+def is_video_file(file):
+    if isinstance(file, (types.Video, types.VideoNote)):
+        return True
+
+    if isinstance(file, types.Document):
+        mime_type = file.mime_type or ""
+        file_name = (file.file_name or "").lower()
+        return mime_type.startswith("video/") or file_name.endswith(VIDEO_FILE_EXTENSIONS)
+
+    return False
+
+
+# Function to create temp file for downloaded audio, returns its path
+def create_spool_file(extension: str):
+    fd, path = tempfile.mkstemp(prefix="voice_", suffix=extension, dir=SPOOL_DIR)
+    os.close(fd)
+    return path
+
+
+# Function to remove downloaded audio temp file
+def remove_spool_file(path: str):
+    if not path:
+        return
+
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(SPOOL_REMOVE_ERROR.format(path, str(e)))
+
+
+# Function to validate and download file from message to temp file
 async def get_file(message: types.Message, reply: bool):
     user = message.from_user
     username = user.username
@@ -21,7 +67,7 @@ async def get_file(message: types.Message, reply: bool):
         message = message.reply_to_message
 
     try:
-        file = message.voice or message.audio or message.video_note or message.video or message.document if message else None
+        file = get_message_file(message)
         if not file:
             logger.info(INVALID_MESSAGE.format(user_id, chat_id, username, trigger_msg.message_id))
             await reply_message(trigger_msg, TG_INVALID_MESSAGE_REPLY)
@@ -85,19 +131,37 @@ async def get_file(message: types.Message, reply: bool):
             await reply_message(message, TG_FILE_REQUEST_ERROR)
             return
 
-        msg = await reply_message(message, TG_FILE_WAIT_DOWNLOAD)
+        # Reply waits for its turn in the chat, download starts at once
+        reply_task = asyncio.ensure_future(reply_message(message, TG_FILE_WAIT_DOWNLOAD))
 
-        # Download the voice message
+        # Download the voice message straight to disk
+        audio_path = None
         try:
-            file_content = await bot.download_file(file_path)
-            data = file_content.read()
+            audio_path = create_spool_file(os.path.splitext(file_path)[1])
+            await bot.download_file(file_path, destination=audio_path)
         except Exception as e:
+            remove_spool_file(audio_path)
             logger.error(DOWNLOAD_ERROR.format(user_id, chat_id, username, file_id, str(e)))
-            msg = await edit_message(msg, TG_FILE_DOWNLOAD_ERROR)
+            msg = await edit_message(await reply_task, TG_FILE_DOWNLOAD_ERROR)
             return
+
+        msg = await reply_task
     except Exception as e:
         logger.error(UNKNOWN_ERROR.format(user_id, chat_id, username, str(e)))
         await reply_message(trigger_msg, TG_FILE_ERROR)
         return
 
-    return data, msg, file.file_id
+    return audio_path, msg, file
+
+
+# Function to download file by id to temp file, used for jobs resumed after restart
+async def download_file_by_id(file_id: str):
+    file_requested = await bot.get_file(file_id)
+    audio_path = create_spool_file(os.path.splitext(file_requested.file_path)[1])
+    try:
+        await bot.download_file(file_requested.file_path, destination=audio_path)
+    except Exception:
+        remove_spool_file(audio_path)
+        raise
+
+    return audio_path
@@ -0,0 +1,347 @@
+import json
+import time
+import sqlite3
+import threading
+from collections import deque
+
+from logger import logger
+from messages.log.quotas import QUOTA_DB_OPEN_ERROR, QUOTA_DB_READ_ERROR, QUOTA_DB_WRITE_ERROR
+from utils import to_thread
+from config import QUOTA_WINDOWS, QUOTA_USER_SECONDS, QUOTA_USER_BYTES, QUOTA_CHAT_SECONDS, QUOTA_CHAT_BYTES, \
+                    QUOTA_FILENAME
+
+
+# Quota scopes: requests of one user and requests in one group chat
+USER_SCOPE = "user"
+CHAT_SCOPE = "chat"
+
+# Default limits for each window of each scope: (audio seconds, bytes)
+DEFAULT_LIMITS = {
+    USER_SCOPE: (QUOTA_USER_SECONDS, QUOTA_USER_BYTES),
+    CHAT_SCOPE: (QUOTA_CHAT_SECONDS, QUOTA_CHAT_BYTES),
+}
+
+# Window is counted in buckets, old usage expires with window / QUOTA_BUCKETS precision
+QUOTA_BUCKETS = 12
+
+# Remove counters of idle users and chats every N seconds
+SWEEP_INTERVAL = 600
+
+# Remove expired usage from the database every N writes
+DB_TRIM_INTERVAL = 100
+db_writes = 0
+
+# Usage counters: (scope, id) -> list of WindowCounter for each window
+usage = {}
+
+# Admin overrides: (scope, id) -> (audio seconds limits, bytes limits), empty lists - unlimited
+overrides = {}
+
+last_sweep = time.time()
+
+db_lock = threading.Lock()
+db_connection = None
+
+
+# Audio seconds and bytes used in rolling window
+class WindowCounter:
+    def __init__(self, window: int):
+        self.window = window
+        self.bucket_size = max(window // QUOTA_BUCKETS, 1)
+
+        # Buckets in order of time: [start, seconds, bytes]
+        self.buckets = deque()
+        self.seconds = 0
+        self.bytes = 0
+
+    # Function to drop buckets that left the window
+    def expire(self, now: float):
+        while self.buckets and self.buckets[0][0] + self.window <= now:
+            _, seconds, size = self.buckets.popleft()
+            self.seconds = max(self.seconds - seconds, 0)
+            self.bytes = max(self.bytes - size, 0)
+
+    # Function to add usage to the current bucket, returns the bucket
+    def add(self, now: float, seconds: float, size: int):
+        start = int(now // self.bucket_size * self.bucket_size)
+        if self.buckets and self.buckets[-1][0] == start:
+            bucket = self.buckets[-1]
+        else:
+            bucket = [start, 0, 0]
+            self.buckets.append(bucket)
+
+        bucket[1] += seconds
+        bucket[2] += size
+        self.seconds += seconds
+        self.bytes += size
+        return bucket
+
+    # Function to take back usage of not processed request, if its bucket is still in the window
+    def remove(self, now: float, bucket: list, seconds: float, size: int):
+        if bucket[0] + self.window <= now:
+            return
+
+        bucket[1] = max(bucket[1] - seconds, 0)
+        bucket[2] = max(bucket[2] - size, 0)
+        self.seconds = max(self.seconds - seconds, 0)
+        self.bytes = max(self.bytes - size, 0)
+
+    # Check if usage with new request fits limits
+    def fits(self, seconds: float, size: int, seconds_limit: float = None, bytes_limit: int = None):
+        return ((seconds_limit is None or self.seconds + seconds <= seconds_limit)
+                and (bytes_limit is None or self.bytes + size <= bytes_limit))
+
+    # Seconds until enough usage expires for new request to fit limits, None if it never fits
+    def wait_time(self, now: float, seconds: float, size: int, seconds_limit: float = None, bytes_limit: int = None):
+        if (seconds_limit is not None and seconds > seconds_limit) or (bytes_limit is not None and size > bytes_limit):
+            return None
+
+        used_seconds = self.seconds
+        used_bytes = self.bytes
+        for start, bucket_seconds, bucket_bytes in self.buckets:
+            used_seconds -= bucket_seconds
+            used_bytes -= bucket_bytes
+            if ((seconds_limit is None or used_seconds + seconds <= seconds_limit)
+                    and (bytes_limit is None or used_bytes + size <= bytes_limit)):
+                return max(start + self.window - now, 0)
+
+        return 0
+
+
+# Usage reserved for request, taken back if request is not processed
+class Charge:
+    def __init__(self, seconds: float, size: int):
+        self.seconds = seconds
+        self.size = size
+
+        # (scope, id, [bucket of each window])
+        self.entries = []
+
+
+# Quota exceeded by request
+class QuotaExceeded:
+    def __init__(self, scope: str, window: int, wait: float = None):
+        self.scope = scope
+        self.window = window
+        self.wait = wait
+
+
+if QUOTA_FILENAME:
+    try:
+        db_connection = sqlite3.connect(QUOTA_FILENAME, check_same_thread=False)
+        db_connection.execute("CREATE TABLE IF NOT EXISTS quota_usage ("
+                              "scope TEXT NOT NULL, id INTEGER NOT NULL, window INTEGER NOT NULL, "
+                              "bucket INTEGER NOT NULL, seconds REAL NOT NULL, bytes INTEGER NOT NULL, "
+                              "PRIMARY KEY (scope, id, window, bucket))")
+        db_connection.execute("CREATE TABLE IF NOT EXISTS quota_overrides ("
+                              "scope TEXT NOT NULL, id INTEGER NOT NULL, seconds TEXT NOT NULL, bytes TEXT NOT NULL, "
+                              "PRIMARY KEY (scope, id))")
+        db_connection.commit()
+    except Exception as e:
+        db_connection = None
+        logger.error(QUOTA_DB_OPEN_ERROR.format(str(e)))
+
+
+# Check if any quota can limit requests
+def is_quota_enabled():
+    return bool(QUOTA_USER_SECONDS or QUOTA_USER_BYTES or QUOTA_CHAT_SECONDS or QUOTA_CHAT_BYTES or overrides)
+
+
+# Get limit of the window from limits list, None - unlimited
+def get_window_limit(limits: list, index: int):
+    return limits[index] if index < len(limits) else None
+
+
+# Get (audio seconds limits, bytes limits) of user or chat
+def get_limits(scope: str, scope_id: int):
+    return overrides.get((scope, scope_id), DEFAULT_LIMITS[scope])
+
+
+# Function to format window length for users
+def format_window(window: int):
+    for size, name in ((86400, "day"), (3600, "hour"), (60, "minute")):
+        if window % size == 0:
+            count = window // size
+            return f"{count} {name}" if count == 1 else f"{count} {name}s"
+
+    return f"{window} seconds"
+
+
+# Get counters of user or chat, created on first use
+def get_counters(scope: str, scope_id: int):
+    counters = usage.get((scope, scope_id))
+    if counters is None:
+        counters = usage[(scope, scope_id)] = [WindowCounter(window) for window in QUOTA_WINDOWS]
+
+    return counters
+
+
+# Function to remove counters without usage in any window
+def sweep(now: float):
+    global last_sweep
+    last_sweep = now
+    for key in list(usage):
+        counters = usage[key]
+        for counter in counters:
+            counter.expire(now)
+
+        if not any(counter.buckets for counter in counters):
+            del usage[key]
+
+
+# Function to check request against quotas of user and group chat and reserve its usage
+# Returns (Charge, None) if request fits all quotas or (None, QuotaExceeded)
+async def reserve_quota(user_id: int, chat_id: int = None, seconds: float = 0, size: int = None):
+    size = size or 0
+    now = time.time()
+    if now - last_sweep >= SWEEP_INTERVAL:
+        sweep(now)
+
+    scopes = [(USER_SCOPE, user_id)]
+    if chat_id is not None:
+        scopes.append((CHAT_SCOPE, chat_id))
+
+    # Check all quotas first, nothing is counted for rejected request
+    for scope, scope_id in scopes:
+        seconds_limits, bytes_limits = get_limits(scope, scope_id)
+        if not seconds_limits and not bytes_limits:
+            continue
+
+        for index, counter in enumerate(get_counters(scope, scope_id)):
+            seconds_limit = get_window_limit(seconds_limits, index)
+            bytes_limit = get_window_limit(bytes_limits, index)
+            counter.expire(now)
+            if not counter.fits(seconds, size, seconds_limit, bytes_limit):
+                wait = counter.wait_time(now, seconds, size, seconds_limit, bytes_limit)
+                return None, QuotaExceeded(scope, counter.window, wait)
+
+    charge = Charge(seconds, size)
+    rows = []
+    for scope, scope_id in scopes:
+        buckets = []
+        for counter in get_counters(scope, scope_id):
+            bucket = counter.add(now, seconds, size)
+            buckets.append(bucket)
+            rows.append((scope, scope_id, counter.window, *bucket))
+
+        charge.entries.append((scope, scope_id, buckets))
+
+    await save_usage(rows)
+    return charge, None
+
+
+# Function to take back usage of request that was not processed
+async def refund_quota(charge: Charge):
+    now = time.time()
+    rows = []
+    for scope, scope_id, buckets in charge.entries:
+        counters = usage.get((scope, scope_id))
+        if not counters:
+            continue
+
+        for counter, bucket in zip(counters, buckets):
+            counter.remove(now, bucket, charge.seconds, charge.size)
+            rows.append((scope, scope_id, counter.window, *bucket))
+
+    charge.entries.clear()
+    await save_usage(rows)
+
+
+# Get usage of user or chat: list of (window, used seconds, seconds limit, used bytes, bytes limit)
+def get_quota_usage(scope: str, scope_id: int):
+    now = time.time()
+    seconds_limits, bytes_limits = get_limits(scope, scope_id)
+    result = []
+    for index, window in enumerate(QUOTA_WINDOWS):
+        counters = usage.get((scope, scope_id))
+        used_seconds = used_bytes = 0
+        if counters:
+            counters[index].expire(now)
+            used_seconds = counters[index].seconds
+            used_bytes = counters[index].bytes
+
+        result.append((window, used_seconds, get_window_limit(seconds_limits, index),
+                       used_bytes, get_window_limit(bytes_limits, index)))
+
+    return result
+
+
+# Function to set admin override of user or chat limits, None - back to default limits
+async def set_quota_override(scope: str, scope_id: int, limits: tuple = None):
+    if limits is None:
+        overrides.pop((scope, scope_id), None)
+    else:
+        overrides[(scope, scope_id)] = limits
+
+    if not db_connection:
+        return
+
+    try:
+        await to_thread(db_set_override, scope, scope_id, limits)
+    except Exception as e:
+        logger.error(QUOTA_DB_WRITE_ERROR.format(str(e)))
+
+
+# Function to persist changed usage buckets
+async def save_usage(rows: list):
+    if not db_connection or not rows:
+        return
+
+    try:
+        await to_thread(db_save_usage, rows)
+    except Exception as e:
+        logger.error(QUOTA_DB_WRITE_ERROR.format(str(e)))
+
+
+# Function to write usage buckets and remove expired ones (blocking)
+def db_save_usage(rows: list):
+    global db_writes
+    with db_lock:
+        db_connection.executemany("INSERT OR REPLACE INTO quota_usage (scope, id, window, bucket, seconds, bytes) "
+                                  "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+        db_writes += 1
+        if db_writes % DB_TRIM_INTERVAL == 0:
+            db_connection.execute("DELETE FROM quota_usage WHERE bucket + window <= ?", (time.time(),))
+
+        db_connection.commit()
+
+
+# Function to write or remove override (blocking)
+def db_set_override(scope: str, scope_id: int, limits: tuple = None):
+    with db_lock:
+        if limits is None:
+            db_connection.execute("DELETE FROM quota_overrides WHERE scope = ? AND id = ?", (scope, scope_id))
+        else:
+            db_connection.execute("INSERT OR REPLACE INTO quota_overrides (scope, id, seconds, bytes) "
+                                  "VALUES (?, ?, ?, ?)", (scope, scope_id, json.dumps(limits[0]), json.dumps(limits[1])))
+
+        db_connection.commit()
+
+
+# Function to load usage and overrides saved before restart, usage of windows no longer configured is skipped
+def load_quotas():
+    now = time.time()
+    with db_lock:
+        usage_rows = db_connection.execute("SELECT scope, id, window, bucket, seconds, bytes FROM quota_usage "
+                                           "WHERE bucket + window > ? ORDER BY bucket", (now,)).fetchall()
+        override_rows = db_connection.execute("SELECT scope, id, seconds, bytes FROM quota_overrides").fetchall()
+
+    for scope, scope_id, window, start, seconds, size in usage_rows:
+        if scope not in DEFAULT_LIMITS or window not in QUOTA_WINDOWS:
+            continue
+
+        counter = get_counters(scope, scope_id)[QUOTA_WINDOWS.index(window)]
+        counter.buckets.append([start, seconds, size])
+        counter.seconds += seconds
+        counter.bytes += size
+
+    for scope, scope_id, seconds_limits, bytes_limits in override_rows:
+        overrides[(scope, scope_id)] = (json.loads(seconds_limits), json.loads(bytes_limits))
+
+
+if db_connection:
+    try:
+        load_quotas()
+    except Exception as e:
+        logger.error(QUOTA_DB_READ_ERROR.format(str(e)))
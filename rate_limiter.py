@@ -0,0 +1,46 @@
+import time
+
+
+# GCRA rate limiter (token bucket equivalent): limit requests in period for each key
+# Keeps one float (theoretical arrival time) per key, keys with full bucket are swept out
+class RateLimiter:
+    def __init__(self, limit: int, period: float):
+        self.emission_interval = period / limit
+        self.tolerance = self.emission_interval * (limit - 1)
+        self.arrivals = {}
+        self.rejected = set()
+        self.sweep_interval = max(period, 1.0)
+        self.last_sweep = time.monotonic()
+
+    # Check if request is allowed and count it
+    # Returns (allowed, first_rejection), first_rejection is True for the first rejected request in a row
+    def check(self, key, now: float = None):
+        if now is None:
+            now = time.monotonic()
+
+        if now - self.last_sweep >= self.sweep_interval:
+            self.sweep(now)
+
+        arrival = max(self.arrivals.get(key, now), now)
+        if arrival - now > self.tolerance:
+            first_rejection = key not in self.rejected
+            self.rejected.add(key)
+            return False, first_rejection
+
+        self.arrivals[key] = arrival + self.emission_interval
+        self.rejected.discard(key)
+        return True, False
+
+    # Function to remove keys idle long enough to have full bucket
+    def sweep(self, now: float = None):
+        if now is None:
+            now = time.monotonic()
+
+        self.last_sweep = now
+        idle = [key for key, arrival in self.arrivals.items() if arrival <= now]
+        for key in idle:
+            del self.arrivals[key]
+            self.rejected.discard(key)
+
+    def __len__(self):
+        return len(self.arrivals)
@@ -0,0 +1,181 @@
+import heapq
+import asyncio
+import itertools
+from collections import deque
+
+from config import SCHEDULER, SCHEDULER_AGING, FAIR_QUEUE_KEY, FAIR_QUEUE_QUANTUM
+
+
+# FIFO API request queue, base class for other schedulers
+class RequestQueue(asyncio.Queue):
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.idle_workers = 0
+        self.workers = 0
+
+    # Get job, counts workers waiting for the new job
+    async def get(self):
+        self.idle_workers += 1
+        try:
+            return await super().get()
+        finally:
+            self.idle_workers -= 1
+
+    # Get jobs in order they will be processed
+    def ordered_jobs(self):
+        return list(self._queue)
+
+    # Get the next job without removing it, None if queue is empty
+    def peek(self):
+        return self._queue[0] if self._queue else None
+
+    # Get 1-based position of the job in queue, 0 if job is not in queue
+    def position(self, job):
+        for i, queued_job in enumerate(self.ordered_jobs()):
+            if queued_job is job:
+                return i + 1
+
+        return 0
+
+    # Check if job has to wait, not picked by idle worker instantly
+    def is_waiting(self, job):
+        return self.position(job) > self.idle_workers
+
+
+# Shortest job first queue, waiting time lowers the job priority key
+# Key = cost + aging * enqueue time, all jobs age equally so key is static
+class ShortestJobFirstQueue(RequestQueue):
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self._queue = []
+        self._counter = itertools.count()
+
+    def _put(self, job):
+        key = job.cost + SCHEDULER_AGING * job.created
+        heapq.heappush(self._queue, (key, next(self._counter), job))
+
+    def _get(self):
+        return heapq.heappop(self._queue)[-1]
+
+    def ordered_jobs(self):
+        return [entry[-1] for entry in sorted(self._queue)]
+
+    def peek(self):
+        return self._queue[0][-1] if self._queue else None
+
+
+# Fair queue, deficit round robin between users (or chats)
+# Each turn a flow gets quantum of audio seconds and spends it on its jobs
+class FairQueue(RequestQueue):
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self._queue = None
+        self._flows = {}
+        self._ring = deque()
+        self._deficit = {}
+        self._credited = False
+        self._size = 0
+
+    def qsize(self):
+        return self._size
+
+    def empty(self):
+        return not self._size
+
+    # Get flow key of the job
+    @staticmethod
+    def flow_key(job):
+        return job.chat_id if FAIR_QUEUE_KEY == "chat" else job.user_id
+
+    # Get job cost for round robin, at least one quantum, so short files of different users alternate
+    @staticmethod
+    def job_cost(job):
+        return max(job.cost, FAIR_QUEUE_QUANTUM)
+
+    # Select next job and update round robin state
+    @classmethod
+    def select(cls, flows: dict, ring: deque, deficit: dict, credited: bool):
+        while True:
+            key = ring[0]
+            flow = flows[key]
+            if not credited:
+                deficit[key] += FAIR_QUEUE_QUANTUM
+                credited = True
+
+            cost = cls.job_cost(flow[0])
+            if deficit[key] >= cost:
+                deficit[key] -= cost
+                job = flow.popleft()
+                if not flow:
+                    del flows[key]
+                    del deficit[key]
+                    ring.popleft()
+                    credited = False
+
+                return job, credited
+
+            ring.rotate(-1)
+            credited = False
+
+    def _put(self, job):
+        key = self.flow_key(job)
+        if key not in self._flows:
+            self._flows[key] = deque()
+            self._deficit[key] = 0
+            self._ring.append(key)
+
+        self._flows[key].append(job)
+        self._size += 1
+
+    def _get(self):
+        job, self._credited = self.select(self._flows, self._ring, self._deficit, self._credited)
+        self._size -= 1
+        return job
+
+    # Simulate round robin on state copy to get processing order
+    def ordered_jobs(self):
+        flows = {key: deque(flow) for key, flow in self._flows.items()}
+        ring = deque(self._ring)
+        deficit = dict(self._deficit)
+        credited = self._credited
+
+        jobs = []
+        for _ in range(self._size):
+            job, credited = self.select(flows, ring, deficit, credited)
+            jobs.append(job)
+
+        return jobs
+
+    # Get the next job, simulates one round robin step
+    def peek(self):
+        if not self._size:
+            return None
+
+        flows = {key: deque(flow) for key, flow in self._flows.items()}
+        job, _ = self.select(flows, deque(self._ring), dict(self._deficit), self._credited)
+        return job
+
+    # Get position of the job, simulates only until job is found
+    def position(self, job):
+        flows = {key: deque(flow) for key, flow in self._flows.items()}
+        ring = deque(self._ring)
+        deficit = dict(self._deficit)
+        credited = self._credited
+
+        for i in range(self._size):
+            selected, credited = self.select(flows, ring, deficit, credited)
+            if selected is job:
+                return i + 1
+
+        return 0
+
+
+# Function to create API request queue for configured scheduler
+def create_request_queue():
+    if SCHEDULER == "sjf":
+        return ShortestJobFirstQueue()
+
+    if SCHEDULER == "fair":
+        return FairQueue()
+
+    return RequestQueue()
@@ -0,0 +1,76 @@
+import asyncio
+import contextvars
+from contextlib import contextmanager
+
+
+# Keeps order of bot replies to requests in each chat
+# Requests are processed at once, only the first reply of the request waits for replies to earlier requests
+# of the same chat. Later messages edit this reply, so their order is kept too.
+
+# Last turn of each chat, removed when all turns of the chat are finished
+chat_turns = {}
+
+# Turn of the request running in current task
+current_turn = contextvars.ContextVar("current_turn", default=None)
+
+
+# Place of a request in chat replies order
+class ChatTurn:
+    def __init__(self, chat_id: int, previous: "ChatTurn" = None):
+        self.chat_id = chat_id
+        self.previous = previous
+        self.replied = False
+
+        # Done when this request and all earlier requests of the chat have replied or finished
+        self.done = asyncio.get_running_loop().create_future()
+
+    # Wait for earlier requests of the chat to reply
+    async def wait(self):
+        if self.previous and not self.replied:
+            await asyncio.shield(self.previous.done)
+
+    # Let the next request of the chat reply, called after reply is sent or request is finished
+    def finish(self):
+        if self.replied:
+            return
+
+        self.replied = True
+        if self.previous and not self.previous.done.done():
+            self.previous.done.add_done_callback(lambda _: self.set_done())
+        else:
+            self.set_done()
+
+    def set_done(self):
+        self.previous = None
+        if not self.done.done():
+            self.done.set_result(None)
+
+        if chat_turns.get(self.chat_id) is self:
+            del chat_turns[self.chat_id]
+
+
+# Context manager to take turn for replies of the request in chat
+@contextmanager
+def chat_turn(chat_id: int):
+    turn = ChatTurn(chat_id, chat_turns.get(chat_id))
+    chat_turns[chat_id] = turn
+    token = current_turn.set(turn)
+    try:
+        yield turn
+    finally:
+        current_turn.reset(token)
+        turn.finish()
+
+
+# Function to wait for turn of current request before reply
+async def wait_chat_turn():
+    turn = current_turn.get()
+    if turn:
+        await turn.wait()
+
+
+# Function to finish turn of current request after reply
+def finish_chat_turn():
+    turn = current_turn.get()
+    if turn:
+        turn.finish()
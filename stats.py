@@ -0,0 +1,55 @@
+import time
+
+from config import SERVICE_TIME_SMOOTHING
+
+
+# Moving average of API service time for one mode
+class ServiceTimeStats:
+    def __init__(self):
+        self.seconds_per_request = None
+        self.seconds_per_audio_second = None
+
+    # Exponential moving average step
+    @staticmethod
+    def smooth(average: float, value: float):
+        if average is None:
+            return value
+
+        return average + SERVICE_TIME_SMOOTHING * (value - average)
+
+    # Function to record measured service time of the request
+    def record(self, elapsed: float, audio_seconds: float):
+        self.seconds_per_request = self.smooth(self.seconds_per_request, elapsed)
+        if audio_seconds:
+            self.seconds_per_audio_second = self.smooth(self.seconds_per_audio_second, elapsed / audio_seconds)
+
+    # Function to estimate service time of the job, None if nothing measured yet
+    def estimate(self, job):
+        if job.cost and self.seconds_per_audio_second is not None:
+            return job.cost * self.seconds_per_audio_second
+
+        return self.seconds_per_request
+
+
+# Context manager to measure service time
+class ServiceTimer:
+    def __init__(self, stats: ServiceTimeStats, audio_seconds: float):
+        self.stats = stats
+        self.audio_seconds = audio_seconds
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Failed requests don't represent normal service time
+        if exc_type is None:
+            self.stats.record(time.monotonic() - self.start, self.audio_seconds)
+
+
+# Function to format estimated wait time for users
+def format_wait_time(seconds: float):
+    if seconds < 60:
+        return f"~{max(10, int(seconds + 9) // 10 * 10)} sec"
+
+    return f"~{int(seconds + 59) // 60} min"
@@ -0,0 +1,54 @@
+import asyncio
+
+from logger import logger
+from messages.log.file import TRANSCODE_ERROR, EXTRACT_AUDIO_ERROR, NO_AUDIO_STREAM
+from audio import AUDIO_COPY_EXTENSIONS, transcode, get_audio_codec, copy_audio_stream
+from process_file import create_spool_file, remove_spool_file
+from config import TRANSCODE_WORKERS, TRANSCODE_CODEC, TRANSCODE_EXTENSION, TRANSCODE_SAMPLE_RATE, \
+                    TRANSCODE_BITRATE
+
+
+# Limits number of ffmpeg processes running at the same time
+transcode_semaphore = asyncio.Semaphore(TRANSCODE_WORKERS)
+
+
+# Function to transcode downloaded job audio to compact format before API request
+# Keeps original file if ffmpeg fails
+async def transcode_job_audio(job):
+    output_path = create_spool_file(TRANSCODE_EXTENSION)
+    try:
+        async with transcode_semaphore:
+            await transcode(job.audio_path, output_path, TRANSCODE_CODEC, TRANSCODE_SAMPLE_RATE, TRANSCODE_BITRATE)
+    except Exception as e:
+        remove_spool_file(output_path)
+        logger.error(TRANSCODE_ERROR.format(job.user_id, job.chat_id, job.username, job.file_id, str(e)))
+        return
+
+    remove_spool_file(job.audio_path)
+    job.audio_path = output_path
+
+
+# Function to replace video file of the job with its audio track
+# Copies audio stream if possible, otherwise transcodes it
+async def extract_job_audio(job):
+    output_path = None
+    try:
+        async with transcode_semaphore:
+            codec = await get_audio_codec(job.audio_path)
+            if not codec:
+                logger.info(NO_AUDIO_STREAM.format(job.user_id, job.chat_id, job.username, job.file_id))
+                return
+
+            if codec in AUDIO_COPY_EXTENSIONS:
+                output_path = create_spool_file(AUDIO_COPY_EXTENSIONS[codec])
+                await copy_audio_stream(job.audio_path, output_path)
+            else:
+                output_path = create_spool_file(TRANSCODE_EXTENSION)
+                await transcode(job.audio_path, output_path, TRANSCODE_CODEC, TRANSCODE_SAMPLE_RATE, TRANSCODE_BITRATE)
+    except Exception as e:
+        remove_spool_file(output_path)
+        logger.error(EXTRACT_AUDIO_ERROR.format(job.user_id, job.chat_id, job.username, job.file_id, str(e)))
+        return
+
+    remove_spool_file(job.audio_path)
+    job.audio_path = output_path
@@ -9,8 +9,9 @@ from bot_init import bot
 from logger import logger
 from messages.log.handlers import ADMIN_BROADCAST_FAIL, ADMIN_BROADCAST_FORWARD_FAIL
 from messages.log.other import LONG_MESSAGE_SEND_ERROR, LOG_FILE_NOT_FOUND, LOG_FILE_READ_ERROR, \
-                                EDIT_MESSAGE_ERROR, SEND_MESSAGE_ERROR, REPLY_MESSAGE_ERROR
+                                EDIT_MESSAGE_ERROR, SEND_MESSAGE_ERROR, REPLY_MESSAGE_ERROR, DELETE_MESSAGE_ERROR
 from messages.telegram.other import TG_LONG_MESSAGE_SEND_ERROR
+from sequencer import wait_chat_turn, finish_chat_turn
 from config import COMMAND_TRANSCRIBE, COMMAND_DIARIZE, INSTANT_REPLY_IN_GROUPS, ADMIN_ID, MAX_FILE_SIZE, \
                     MAX_DURATION_SECONDS, MAX_SIMULTANIOUS_REQUESTS, USER_RATE_LIMIT, USER_REQUEST_TIME, MAX_MESSAGE_LENGTH
 
@@ -18,10 +19,15 @@ from config import COMMAND_TRANSCRIBE, COMMAND_DIARIZE, INSTANT_REPLY_IN_GROUPS,
 # Add supports to python 3.7-3.8 (asyncio.to_thread)
 # Copied from source code: https://github.com/python/cpython/blob/main/Lib/asyncio/threads.py#L12
 async def to_thread(func, /, *args, **kwargs):
+    return await to_executor(None, func, *args, **kwargs)
+
+
+# Run blocking function in given executor (None - default executor)
+async def to_executor(executor, func, /, *args, **kwargs):
     loop = asyncio.get_running_loop()
     ctx = contextvars.copy_context()
     func_call = partial(ctx.run, func, *args, **kwargs)
-    return await loop.run_in_executor(None, func_call)
+    return await loop.run_in_executor(executor, func_call)
 
 
 # Function to send the message
@@ -45,16 +51,29 @@ async def edit_message(message: types.Message, text: str, parse_mode=None, send_
         return await send_message(message.chat.id, text, parse_mode=parse_mode)
 
 
+# Function to delete the message
+async def delete_message(message: types.Message):
+    try:
+        await message.delete()
+    except Exception as e:
+        logger.error(DELETE_MESSAGE_ERROR.format(str(e)))
+
+
 # Function to reply to the message
+# First reply of request waits for replies to earlier requests of the chat
 async def reply_message(message: types.Message, text: str, parse_mode=None, send_new=True):
+    await wait_chat_turn()
     try:
-        msg = await message.reply(text, parse_mode=parse_mode)
-        return msg
-    except Exception as e:
-        logger.error(REPLY_MESSAGE_ERROR.format(str(e)))
+        try:
+            msg = await message.reply(text, parse_mode=parse_mode)
+            return msg
+        except Exception as e:
+            logger.error(REPLY_MESSAGE_ERROR.format(str(e)))
 
-    if send_new:
-        return await send_message(message.chat.id, text, parse_mode=parse_mode)
+        if send_new:
+            return await send_message(message.chat.id, text, parse_mode=parse_mode)
+    finally:
+        finish_chat_turn()
 
 
 # Check if message has not opened <code> tag
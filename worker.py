@@ -0,0 +1,13 @@
+import sys
+
+from broker import worker_process
+
+
+# Standalone worker process for split mode: python worker.py worker-name [index count]
+# With index and count set, concurrency caps are split between count standalone workers
+if __name__ == "__main__":
+    worker_id = sys.argv[1] if len(sys.argv) > 1 else "worker"
+    if len(sys.argv) > 3:
+        worker_process(worker_id, int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        worker_process(worker_id)